@@ -38,6 +38,12 @@ axiosInstance.interceptors.response.use(
     }
 );
 
+// Fields the session view renders; the resume and job description are never re-downloaded
+const SESSION_STATE_FIELDS = 'role,current_question,response_history';
+
+// Last session state per session, revalidated with its ETag so unchanged polls return 304
+const sessionStateCache = new Map<string, { etag: string; state: SessionState }>();
+
 export const api = {
     startSession: async (role: string, resume: File, jobDescription: string): Promise<StartSessionResponse> => {
         try {
@@ -73,7 +79,8 @@ export const api = {
         console.log('Payload to backend:', request);
         const response = await axiosInstance.post<SubmitResponseResponse>('/api/submit-response', {
             session_id: request.session_id,
-            response: request.response
+            response: request.response,
+            evaluation_mode: request.evaluation_mode
         });
         return response.data;
     },
@@ -94,13 +101,23 @@ export const api = {
         if (!auth.currentUser) {
             throw new Error('User must be authenticated to get session state');
         }
+        const cached = sessionStateCache.get(sessionId);
         const response = await axiosInstance.get<SessionState>(`/api/get-session`, {
-            params: { session_id: sessionId, user_id: auth.currentUser.uid }
+            params: { session_id: sessionId, user_id: auth.currentUser.uid, fields: SESSION_STATE_FIELDS },
+            headers: cached ? { 'If-None-Match': cached.etag } : {},
+            validateStatus: (status) => (status >= 200 && status < 300) || status === 304
         });
+        if (response.status === 304 && cached) {
+            return cached.state;
+        }
         console.log('Fetched session state:', response.data);
         if (!response.data.session_id) {
             response.data.session_id = sessionId;
         }
+        const etag = response.headers['etag'];
+        if (etag) {
+            sessionStateCache.set(sessionId, { etag, state: response.data });
+        }
         return response.data;
     },
 };
@@ -1,16 +1,23 @@
+export interface CriterionScores {
+    technical: number;
+    clarity: number;
+    practical: number;
+}
+
 export interface InterviewResponse {
     question: string;
     response: string;
     score: number;
     feedback: string;
     timestamp: string;
+    breakdown?: CriterionScores | null;
 }
 
 export interface SessionState {
     session_id: string;
     role: string;
-    resume_text: string;
-    job_description: string;
+    resume_text?: string;
+    job_description?: string;
     current_question: string;
     response_history: InterviewResponse[];
 }
@@ -23,10 +30,12 @@ export interface StartSessionResponse {
 export interface SubmitResponseRequest {
     session_id: string;
     response: string;
+    evaluation_mode?: 'separate' | 'combined';
 }
 
 export interface SubmitResponseResponse {
     score: number;
+    breakdown?: CriterionScores | null;
     feedback: string;
     total_questions_answered: number;
 } 
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+Import-time and cold-start benchmark for the Cloud Functions in main.py.
+
+Every function runs in its own instance but imports the whole of main.py, so
+the module import is paid on every cold start. Each scenario below runs in a
+fresh interpreter: it imports main and then the modules that endpoint pulls in
+on its first request, without touching the network or credentials.
+
+    python benchmarks/cold_start.py                 # report
+    python benchmarks/cold_start.py --check         # also enforce the rules below
+    python benchmarks/cold_start.py --write-baseline
+
+--check fails if:
+  * importing main loads any module in HEAVY_MODULES (machine independent), or
+  * a scenario's median is more than --tolerance above its recorded baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / 'cold_start_baseline.json'
+
+# Modules only the LLM and PDF endpoints need; `import main` must not load them
+HEAVY_MODULES = (
+    'openai',
+    'httpx',
+    'tiktoken',
+    'PyPDF2',
+    'pydantic',
+    'google.cloud.storage',
+    'mcp_orchestrator.app.agents.base',
+)
+
+# What each endpoint imports on its first request, after `import main`
+SCENARIOS = {
+    'get_session': [],
+    'end_session': ['firebase_admin.storage'],
+    'submit_response': [
+        'mcp_orchestrator.app.agents.base',
+        'mcp_orchestrator.app.utils.memo',
+        'mcp_orchestrator.app.utils.runtime',
+        'mcp_orchestrator.app.utils.stage_executor',
+        'mcp_orchestrator.app.utils.speculation',
+    ],
+    'start_session': [
+        'mcp_orchestrator.app.agents.base',
+        'mcp_orchestrator.app.utils.runtime',
+        'mcp_orchestrator.app.utils.speculation',
+        'mcp_orchestrator.app.utils.resume_cache',
+        'mcp_orchestrator.app.utils.pdf_parser',
+        'mcp_orchestrator.app.utils.resume_ingest',
+    ],
+}
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+import main
+imported_main = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+done = time.perf_counter()
+print(json.dumps({{
+    'import_main_ms': (imported_main - start) * 1000,
+    'total_ms': (done - start) * 1000,
+    'heavy_loaded': [m for m in {heavy!r} if m in sys.modules] if not {modules!r} else [],
+}}))
+"""
+
+def run_probe(modules):
+    code = PROBE.format(modules=modules, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=FUNCTIONS_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def slowest_imports(limit):
+    """Modules with the largest cumulative import time under `import main`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=FUNCTIONS_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split('|'))
+        rows.append((int(cumulative) / 1000, name))
+    return sorted(rows, reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7, help='fresh interpreters per scenario')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--check', action='store_true', help='exit non-zero on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown over the baseline')
+    parser.add_argument('--write-baseline', action='store_true', help=f'record medians to {BASELINE_PATH.name}')
+    args = parser.parse_args()
+
+    medians = {}
+    failures = []
+    print(f"{'scenario':<18}{'median ms':>10}{'min ms':>10}{'max ms':>10}{'main ms':>10}")
+    for name, modules in SCENARIOS.items():
+        samples = [run_probe(modules) for _ in range(args.runs)]
+        totals = [sample['total_ms'] for sample in samples]
+        medians[name] = statistics.median(totals)
+        print(f"{name:<18}{medians[name]:>10.1f}{min(totals):>10.1f}{max(totals):>10.1f}"
+              f"{statistics.median(s['import_main_ms'] for s in samples):>10.1f}")
+        heavy = samples[0]['heavy_loaded']
+        if heavy:
+            failures.append(f"`import main` loads {', '.join(heavy)}")
+
+    print("\nSlowest imports under `import main` (cumulative ms):")
+    for cumulative, module in slowest_imports(args.top):
+        print(f"{cumulative:>10.1f}  {module}")
+
+    if args.write_baseline:
+        BASELINE_PATH.write_text(json.dumps({k: round(v, 1) for k, v in medians.items()}, indent=2) + '\n')
+        print(f"\nWrote {BASELINE_PATH}")
+
+    if args.check:
+        if BASELINE_PATH.exists():
+            baseline = json.loads(BASELINE_PATH.read_text())
+            for name, median in medians.items():
+                limit = baseline.get(name, float('inf')) * (1 + args.tolerance)
+                if median > limit:
+                    failures.append(f"{name}: {median:.1f} ms exceeds {limit:.1f} ms")
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if failures:
+            sys.exit(1)
+        print("\nOK")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Offline end-to-end benchmark for the Cloud Functions in main.py.
+
+Drives start_session, submit_response, get_session and end_session in-process,
+as the Functions runtime would, against:
+  * a local OpenAI-compatible stand-in (fake_llm.py) with configurable time to
+    first token, jitter and token throughput, and
+  * in-memory Firestore, Storage and token-verification fakes (fakes.py).
+No network, credentials or emulators are needed, so runs are reproducible.
+
+Each virtual candidate uploads a resume, starts a session, answers --turns
+questions (polling get_session after each, once fresh and once with the
+ETag the frontend would send) and ends the session. A timing pass reports
+p50/p95/p99 per endpoint; a separate, sequential pass under tracemalloc
+reports allocations per call, so tracing does not distort the latencies.
+
+    python benchmarks/e2e.py
+    python benchmarks/e2e.py --sessions 50 --concurrency 8 --latency-ms 600
+    python benchmarks/e2e.py --write-baseline                # on main
+    python benchmarks/e2e.py --check --tolerance 0.2         # on a branch
+
+--check fails if an endpoint's p50 or p95 latency, or its median peak
+allocation, is more than --tolerance above the baseline. Baselines record
+the settings they were taken with and are only compared like for like.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / 'e2e_baseline.json'
+sys.path.insert(0, str(FUNCTIONS_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_llm import FakeLLMServer, add_arguments, llm_options  # noqa: E402
+from fakes import FakeBucket, FakeFirestore, fake_token, resume_pdf, verify_fake_token  # noqa: E402
+
+ROLE = 'Machine Learning Scientist'
+JOB_DESCRIPTION = (
+    "We're seeking an experienced Machine Learning Scientist to join our AI team. You will develop and "
+    "deploy ML models, work across the stack from data processing to serving, and mentor other engineers. "
+    "Requirements: 5+ years of ML experience, an advanced degree in CS or Mathematics, expertise in "
+    "PyTorch or TensorFlow, and strong communication skills."
+)
+RESUME_LINES = [
+    'Data Scientist / Machine Learning Engineer',
+    'EXPERIENCE',
+    'Senior Machine Learning Engineer | TechCorp (2020-Present)',
+    '- Developed and deployed production ML models using TensorFlow and PyTorch',
+    '- Improved model accuracy by 25% using advanced feature engineering',
+    'Data Scientist | AI Solutions Inc. (2018-2020)',
+    '- Built classification models for customer segmentation',
+    'SKILLS: Python, R, SQL, TensorFlow, PyTorch, scikit-learn, Docker, AWS',
+    'EDUCATION: M.S. Computer Science | Tech University (2018)',
+]
+ANSWER = (
+    "At TechCorp I took a fraud model from a notebook prototype to a real-time service. We containerised the "
+    "feature pipeline, served the model behind a gRPC endpoint with a 50 ms budget, and shadowed it against "
+    "the old rules engine for two weeks. After launch we tracked precision at a fixed recall, feature drift "
+    "with population stability, and p99 latency, with alerts wired to the on-call rotation."
+)
+ENDPOINTS = ('start_session', 'submit_response', 'get_session', 'get_session_cached', 'end_session')
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return float('nan')
+    rank = max(1, -(-len(samples) * pct // 100))
+    return samples[int(rank) - 1]
+
+class Bench:
+    """Holds the app wired to the fakes and runs candidate flows against it."""
+
+    def __init__(self, main, db, bucket):
+        self.main = main
+        self.db = db
+        self.bucket = bucket
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.allocations = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self.trace = False
+        self._lock = threading.Lock()
+
+    def call(self, label, handler, token, method='POST', body=None, query=None, headers=None):
+        from flask import Request
+        from werkzeug.test import EnvironBuilder
+
+        environ = EnvironBuilder(method=method, json=body, query_string=query,
+                                 headers={'Authorization': f'Bearer {token}', **(headers or {})}).get_environ()
+        request = Request(environ)
+        if self.trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        response = handler(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            if response.status_code >= 400:
+                self.errors[label] += 1
+                print(f'{label}: {response.status_code} {response.get_data(as_text=True)[:200]}', file=sys.stderr)
+            elif self.trace:
+                current, peak = tracemalloc.get_traced_memory()
+                self.allocations[label].append((peak - before, current - before))
+            else:
+                self.latencies[label].append(elapsed_ms)
+        return response
+
+    def candidate(self, index, turns):
+        uid = f'bench-user-{index}'
+        token = fake_token(uid)
+        path = f'resumes/{uid}/resume.pdf'
+        self.bucket.blob(path).upload_from_string(resume_pdf([f'CANDIDATE {index}', *RESUME_LINES]),
+                                                  content_type='application/pdf')
+
+        response = self.call('start_session', self.main.start_session, token, body={
+            'resume_url': f'gs://{self.bucket.name}/{path}',
+            'role': ROLE,
+            'job_description': JOB_DESCRIPTION,
+        })
+        if response.status_code >= 400:
+            return
+        session_id = response.get_json()['session_id']
+        query = {'session_id': session_id, 'fields': 'role,current_question,response_history'}
+
+        for _ in range(turns):
+            self.call('submit_response', self.main.submit_response, token,
+                      body={'session_id': session_id, 'response': ANSWER})
+            polled = self.call('get_session', self.main.get_session, token, method='GET', query=query)
+            etag = polled.headers.get('ETag')
+            if etag:
+                self.call('get_session_cached', self.main.get_session, token, method='GET', query=query,
+                          headers={'If-None-Match': etag})
+
+        self.call('end_session', self.main.end_session, token, body={'session_id': session_id})
+
+def load_app(rpc_latency):
+    """Import main and point its lazily created clients at the fakes."""
+    import main
+    from mcp_orchestrator.app.utils.token_cache import VerifiedTokenCache
+
+    db = FakeFirestore(rpc_latency=rpc_latency)
+    bucket = FakeBucket(rpc_latency=rpc_latency)
+    token_cache = VerifiedTokenCache(verify_fake_token)
+    main.get_db = lambda: db
+    main.get_bucket = lambda: bucket
+    main.get_token_cache = lambda: token_cache
+    return Bench(main, db, bucket)
+
+def summarize(bench, sessions, fake_llm):
+    results = {}
+    for name in ENDPOINTS:
+        samples = sorted(bench.latencies[name])
+        allocations = bench.allocations[name]
+        results[name] = {
+            'count': len(samples),
+            'errors': bench.errors[name],
+            'p50_ms': round(percentile(samples, 50), 1),
+            'p95_ms': round(percentile(samples, 95), 1),
+            'p99_ms': round(percentile(samples, 99), 1),
+            'mean_ms': round(statistics.fmean(samples), 1) if samples else float('nan'),
+            'peak_kib': round(statistics.median(a[0] for a in allocations) / 1024, 1) if allocations else None,
+            'retained_kib': round(statistics.median(a[1] for a in allocations) / 1024, 1) if allocations else None,
+        }
+    return {
+        'endpoints': results,
+        'firestore_rpcs_per_session': round(bench.db.rpcs / sessions, 1),
+        'llm_requests_per_session': round(fake_llm.requests / sessions, 1),
+        'llm_rate_limited': fake_llm.rate_limited,
+    }
+
+def settings(args):
+    return {key: getattr(args, key) for key in (
+        'sessions', 'turns', 'concurrency', 'latency_ms', 'jitter_ms', 'tokens_per_sec', 'rpm', 'rpc_latency_ms')}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20, help='candidates in the timing pass')
+    parser.add_argument('--turns', type=int, default=3, help='answers per session')
+    parser.add_argument('--concurrency', type=int, default=1, help='candidates in flight at once')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed candidates run first')
+    parser.add_argument('--alloc-sessions', type=int, default=3, help='candidates in the tracemalloc pass')
+    parser.add_argument('--rpc-latency-ms', type=float, default=0.0, help='delay per Firestore/Storage call')
+    add_arguments(parser)
+    parser.add_argument('--check', action='store_true', help='exit non-zero on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown over the baseline')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline file to write or compare')
+    parser.add_argument('--write-baseline', action='store_true', help='record this run as the baseline')
+    parser.add_argument('--output', type=Path, help='also write the full results as JSON')
+    parser.add_argument('--verbose', action='store_true', help="show the functions' own log lines")
+    args = parser.parse_args()
+
+    app_logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with FakeLLMServer(**llm_options(args)) as server, app_logs:
+        os.environ['OPENAI_BASE_URL'] = server.base_url
+        os.environ['OPENAI_API_KEY'] = 'fake'
+        bench = load_app(args.rpc_latency_ms / 1000)
+
+        for index in range(args.warmup):
+            bench.candidate(f'warmup-{index}', args.turns)
+        bench.latencies = {name: [] for name in ENDPOINTS}
+        bench.errors = {name: 0 for name in ENDPOINTS}
+        bench.db.rpcs = 0
+        server.llm.requests = 0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda index: bench.candidate(index, args.turns), range(args.sessions)))
+        wall_sec = time.perf_counter() - started
+        summary = summarize(bench, args.sessions, server.llm)
+
+        tracemalloc.start()
+        bench.trace = True
+        for index in range(args.alloc_sessions):
+            bench.candidate(f'alloc-{index}', args.turns)
+        bench.trace = False
+        tracemalloc.stop()
+        for name, allocations in bench.allocations.items():
+            if allocations:
+                summary['endpoints'][name]['peak_kib'] = round(statistics.median(a[0] for a in allocations) / 1024, 1)
+                summary['endpoints'][name]['retained_kib'] = round(statistics.median(a[1] for a in allocations) / 1024, 1)
+
+    print(f"{'endpoint':<20}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}"
+          f"{'peak KiB':>10}{'kept KiB':>10}")
+    for name, row in summary['endpoints'].items():
+        print(f"{name:<20}{row['count']:>6}{row['errors']:>5}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+              f"{row['p99_ms']:>9.1f}{row['mean_ms']:>9.1f}{row['peak_kib'] or 0:>10.1f}{row['retained_kib'] or 0:>10.1f}")
+    print(f"\n{args.sessions} sessions in {wall_sec:.1f}s at concurrency {args.concurrency}; "
+          f"{summary['firestore_rpcs_per_session']} Firestore calls and "
+          f"{summary['llm_requests_per_session']} LLM calls per session, {summary['llm_rate_limited']} rate limited")
+
+    result = {'settings': settings(args), **summary}
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + '\n')
+    if args.write_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2) + '\n')
+        print(f"\nWrote {args.baseline}")
+
+    if args.check:
+        failures = [f"{name}: {row['errors']} errors" for name, row in summary['endpoints'].items() if row['errors']]
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+            if baseline['settings'] != result['settings']:
+                failures.append(f"{args.baseline.name} was recorded with different settings: {baseline['settings']}")
+            else:
+                for name, row in summary['endpoints'].items():
+                    for metric in ('p50_ms', 'p95_ms', 'peak_kib'):
+                        recorded = baseline['endpoints'].get(name, {}).get(metric)
+                        if recorded and row[metric] is not None and row[metric] > recorded * (1 + args.tolerance):
+                            failures.append(f"{name} {metric}: {row[metric]} exceeds baseline {recorded}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+        if failures:
+            sys.exit(1)
+        print("\nOK")
+
+if __name__ == '__main__':
+    main()
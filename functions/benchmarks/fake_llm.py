@@ -0,0 +1,232 @@
+"""
+Local OpenAI-compatible stand-in for benchmarks.
+
+Serves ``POST /v1/chat/completions``, streaming and not, with a configurable
+time to first token, jitter and token throughput, and answers each of the
+app's prompts (digest, question, scorer, evaluator, feedback) with output of
+the shape the agents parse. Every response carries ``x-ratelimit-*`` headers;
+with --rpm it also answers 429 once the per-minute request budget is spent,
+so the LLM scheduler's backoff can be exercised.
+
+    python benchmarks/fake_llm.py --port 8089 --latency-ms 400 --tokens-per-sec 80
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake ...
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+DIGEST = {
+    'candidate_summary': 'Machine learning engineer with five years of production model experience.',
+    'skills': ['Python', 'PyTorch', 'TensorFlow', 'SQL', 'Docker', 'AWS'],
+    'experience_highlights': ['Deployed real-time prediction systems', 'Improved model accuracy by 25%'],
+    'role_requirements': ['5+ years of ML experience', 'Expert in PyTorch or TensorFlow', 'Large-scale data'],
+    'focus_areas': ['Model deployment', 'Feature engineering', 'Experiment design'],
+}
+QUESTIONS = (
+    'Walk me through how you took a model from prototype to production, and what you monitored after launch.',
+    'How would you design features for a real-time prediction system with strict latency limits?',
+    'Describe an A/B test you ran on a model change. How did you decide it was significant?',
+    'When would you choose PyTorch over TensorFlow, and what trade-offs have you hit in practice?',
+    'How do you detect and respond to data drift in a deployed model?',
+)
+FEEDBACK = ('Strong, concrete example with measurable impact. The answer would be clearer with a short summary '
+            'of the trade-offs you considered first. Next time, name the metric you optimised and why.')
+
+def reply_for(messages, rng):
+    """Output shaped like the real model's answer to the prompt in ``messages``."""
+    system = messages[0]['content'] if messages else ''
+    user = messages[-1]['content'] if messages else ''
+    if 'candidate_summary' in user:
+        return json.dumps(DIGEST)
+    if '"technical"' in user:
+        return json.dumps({
+            'technical': round(rng.uniform(0.5, 0.95), 2),
+            'clarity': round(rng.uniform(0.5, 0.95), 2),
+            'practical': round(rng.uniform(0.5, 0.95), 2),
+            'feedback': FEEDBACK,
+        })
+    if 'numerical score' in system:
+        return f'{rng.uniform(0.5, 0.95):.2f}'
+    if 'feedback' in system:
+        return FEEDBACK
+    return rng.choice(QUESTIONS)
+
+def count_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+class FakeLLM:
+    """Latency model and request accounting shared by the handler threads."""
+
+    def __init__(self, latency_ms=300.0, jitter_ms=100.0, tokens_per_sec=100.0, rpm=None, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.tokens_per_sec = tokens_per_sec
+        self.rpm = rpm
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self.requests = 0
+        self.rate_limited = 0
+
+    def time_to_first_token(self):
+        with self._lock:
+            return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def reply(self, messages):
+        with self._lock:
+            return reply_for(messages, self._rng)
+
+    def admit(self):
+        """Return the seconds to wait if the request is over the RPM budget, else None."""
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.rpm is not None and len(self._recent) >= self.rpm:
+                self.rate_limited += 1
+                return 60 - (now - self._recent[0])
+            self._recent.append(now)
+            return None
+
+    def headers(self):
+        limit = self.rpm or 1_000_000
+        with self._lock:
+            remaining = max(0, limit - len(self._recent))
+        return {
+            'x-ratelimit-limit-requests': str(limit),
+            'x-ratelimit-remaining-requests': str(remaining),
+            'x-ratelimit-limit-tokens': '10000000',
+            'x-ratelimit-remaining-tokens': '10000000',
+        }
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    llm: FakeLLM = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            self._json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+            return
+
+        wait = self.llm.admit()
+        if wait is not None:
+            self._json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                       {**self.llm.headers(), 'retry-after-ms': str(int(wait * 1000))})
+            return
+
+        messages = body.get('messages', [])
+        content = self.llm.reply(messages)
+        usage = {
+            'prompt_tokens': sum(count_tokens(m.get('content', '')) for m in messages),
+            'completion_tokens': count_tokens(content),
+        }
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        model = body.get('model', 'fake')
+        time.sleep(self.llm.time_to_first_token())
+
+        if not body.get('stream'):
+            time.sleep(usage['completion_tokens'] / self.llm.tokens_per_sec)
+            self._json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage,
+            }, self.llm.headers())
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        for name, value in self.llm.headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def send(choices, **extra):
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': choices, **extra}
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+
+        send([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+        pieces = [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
+        for piece in pieces:
+            time.sleep(1 / self.llm.tokens_per_sec)
+            send([{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+        send([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            send([], usage=usage)
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+        self.close_connection = True
+
+class FakeLLMServer:
+    """Runs the stand-in on a background thread; ``base_url`` is what OPENAI_BASE_URL should be."""
+
+    def __init__(self, host='127.0.0.1', port=0, **llm_options):
+        self.llm = FakeLLM(**llm_options)
+        handler = type('BoundHandler', (Handler,), {'llm': self.llm})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+def add_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=300.0, help='mean time to first token')
+    parser.add_argument('--jitter-ms', type=float, default=100.0, help='uniform +/- jitter on the latency')
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0, help='completion token throughput')
+    parser.add_argument('--rpm', type=int, default=None, help='answer 429 above this many requests per minute')
+    parser.add_argument('--seed', type=int, default=0)
+
+def llm_options(args):
+    return {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'tokens_per_sec': args.tokens_per_sec,
+            'rpm': args.rpm, 'seed': args.seed}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_arguments(parser)
+    args = parser.parse_args()
+    with FakeLLMServer(args.host, args.port, **llm_options(args)) as server:
+        print(f'Fake OpenAI API at {server.base_url}')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+"""
+In-memory stand-ins for Firestore, Cloud Storage and ID-token verification.
+
+They implement the slice of the client APIs that main.py and the session
+helpers use, with the same semantics: transactions are serialised, field
+transforms (SERVER_TIMESTAMP, DELETE_FIELD, Increment, ArrayUnion, Maximum,
+Minimum) are applied on write, and ``update`` takes dotted field paths. An
+optional per-RPC delay stands in for the network round trip.
+"""
+import copy
+import io
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from google.api_core import exceptions
+from google.cloud.firestore_v1 import transforms
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        value = self._data
+        for part in field.split('.'):
+            value = value[part]
+        return copy.deepcopy(value)
+
+def _project(data, field_paths):
+    if data is None or field_paths is None:
+        return data
+    projected = {}
+    for path in field_paths:
+        source, target = data, projected
+        parts = path.split('.')
+        for part in parts[:-1]:
+            if not isinstance(source.get(part), dict):
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = copy.deepcopy(source[parts[-1]])
+    return projected
+
+def _apply(current, value):
+    """The stored value for a field after writing ``value`` over ``current``."""
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, transforms.Increment):
+        return (current if isinstance(current, (int, float)) else 0) + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if not isinstance(current, (int, float)) else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if not isinstance(current, (int, float)) else min(current, value.value)
+    if isinstance(value, transforms.ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        return result + [item for item in value.values if item not in result]
+    if isinstance(value, transforms.ArrayRemove):
+        return [item for item in current or [] if item not in value.values]
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        return {key: _apply(base.get(key), item) for key, item in value.items()
+                if item is not transforms.DELETE_FIELD}
+    return copy.deepcopy(value)
+
+def _write_path(data, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    if value is transforms.DELETE_FIELD:
+        data.pop(parts[-1], None)
+    else:
+        data[parts[-1]] = _apply(data.get(parts[-1]), value)
+
+def _leaf_paths(data, prefix=''):
+    """Field paths of the leaves of ``data``; ``set(merge=True)`` merges nested maps down to these."""
+    for key, value in data.items():
+        if isinstance(value, dict) and value:
+            yield from _leaf_paths(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+class FakeDocumentReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return FakeCollectionReference(self._db, f'{self.path}/{name}')
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        self._db.rpc()
+        with self._db.lock:
+            data, update_time = self._db.read(self.path)
+            return FakeSnapshot(self, _project(data, field_paths), update_time)
+
+    def set(self, data, merge=False):
+        self._db.rpc()
+        with self._db.lock:
+            self._db.apply([('set', self.path, data, merge)])
+
+    def update(self, data):
+        self._db.rpc()
+        with self._db.lock:
+            self._db.apply([('update', self.path, data, False)])
+
+    def delete(self):
+        self._db.rpc()
+        with self._db.lock:
+            self._db.apply([('delete', self.path, None, False)])
+
+class FakeQuery:
+    OPERATORS = {
+        '==': lambda a, b: a == b,
+        '!=': lambda a, b: a != b,
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '>': lambda a, b: a > b,
+        '>=': lambda a, b: a >= b,
+        'in': lambda a, b: a in b,
+    }
+
+    def __init__(self, collection, filters=(), order=None, limit_to=None):
+        self._collection = collection
+        self._filters = list(filters)
+        self._order = order
+        self._limit = limit_to
+
+    def where(self, field, op, value):
+        return FakeQuery(self._collection, self._filters + [(field, op, value)], self._order, self._limit)
+
+    def order_by(self, field, direction='ASCENDING'):
+        return FakeQuery(self._collection, self._filters, (field, direction), self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self._collection, self._filters, self._order, count)
+
+    def _run(self):
+        db = self._collection._db
+        db.rpc()
+        with db.lock:
+            snapshots = []
+            for path, (data, update_time) in db.children(self._collection.path):
+                if all(field in data and self.OPERATORS[op](data[field], value)
+                       for field, op, value in self._filters):
+                    snapshots.append(FakeSnapshot(FakeDocumentReference(db, path), copy.deepcopy(data), update_time))
+        if self._order:
+            field, direction = self._order
+            snapshots.sort(key=lambda s: s._data.get(field), reverse=direction == 'DESCENDING')
+        return snapshots[:self._limit] if self._limit is not None else snapshots
+
+    def stream(self, transaction=None):
+        yield from self._run()
+
+    def get(self, transaction=None):
+        return self._run()
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        super().__init__(self)
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._db, f'{self.path}/{document_id or uuid.uuid4().hex[:20]}')
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(('set', reference.path, data, merge))
+
+    def update(self, reference, data):
+        self._writes.append(('update', reference.path, data, False))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference.path, None, False))
+
+    def commit(self):
+        self._db.rpc()
+        with self._db.lock:
+            self._db.apply(self._writes)
+        self._writes = []
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    A pessimistic transaction: it holds the database lock from begin to commit.
+
+    Implements the hooks ``firestore.transactional`` drives.
+    """
+
+    _read_only = False
+    _max_attempts = 5
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._id = None
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._db.rpc()
+        self._db.lock.acquire()
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        try:
+            self._db.apply(self._writes)
+        finally:
+            self._release()
+
+    def _rollback(self):
+        self._release()
+
+    def _release(self):
+        if self._id is not None:
+            self._id = None
+            self._writes = []
+            self._db.lock.release()
+
+class FakeFirestore:
+    """Documents live in one dict keyed by path; every call may sleep ``rpc_latency`` seconds."""
+
+    def __init__(self, rpc_latency=0.0):
+        self.rpc_latency = rpc_latency
+        self.lock = threading.RLock()
+        # path -> (data, update_time)
+        self.documents = {}
+        # collection path -> paths of its documents
+        self.collections = {}
+        self.rpcs = 0
+
+    def rpc(self):
+        self.rpcs += 1
+        if self.rpc_latency:
+            time.sleep(self.rpc_latency)
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        self.rpc()
+        with self.lock:
+            for reference in references:
+                data, update_time = self.read(reference.path)
+                yield FakeSnapshot(reference, _project(data, field_paths), update_time)
+
+    def read(self, path):
+        data, update_time = self.documents.get(path, (None, None))
+        return copy.deepcopy(data), update_time
+
+    def children(self, collection_path):
+        return [(path, self.documents[path]) for path in self.collections.get(collection_path, ())]
+
+    def apply(self, writes):
+        """Apply a batch of writes atomically: all land, or none if one fails."""
+        staged = {}
+        for kind, path, data, merge in writes:
+            current = staged[path] if path in staged else self.read(path)[0]
+            if kind == 'delete':
+                staged[path] = None
+            elif kind == 'update' and current is None:
+                raise exceptions.NotFound(f'No document to update: {path}')
+            elif kind == 'update':
+                for key, value in data.items():
+                    _write_path(current, key, value)
+                staged[path] = current
+            elif merge and current is not None:
+                for key, value in _leaf_paths(data):
+                    _write_path(current, key, value)
+                staged[path] = current
+            else:
+                staged[path] = _apply(None, data)
+        update_time = datetime.now(timezone.utc)
+        for path, data in staged.items():
+            collection = self.collections.setdefault(path.rsplit('/', 1)[0], set())
+            if data is None:
+                self.documents.pop(path, None)
+                collection.discard(path)
+            else:
+                self.documents[path] = (data, update_time)
+                collection.add(path)
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+
+    @property
+    def _object(self):
+        return self.bucket.objects.get(self.name)
+
+    @property
+    def size(self):
+        return len(self._object[0]) if self._object else None
+
+    @property
+    def generation(self):
+        return self._object[1] if self._object else None
+
+    @property
+    def public_url(self):
+        return f'https://storage.googleapis.com/{self.bucket.name}/{self.name}'
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        self.bucket.rpc()
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.content_type = content_type
+        with self.bucket.lock:
+            self.bucket.generation += 1
+            self.bucket.objects[self.name] = (data, self.bucket.generation)
+
+    def download_as_bytes(self, **kwargs):
+        self.bucket.rpc()
+        return self._object[0]
+
+    def open(self, mode='rb', if_generation_match=None, **kwargs):
+        self.bucket.rpc()
+        if self._object is None:
+            raise exceptions.NotFound(f'No such object: {self.name}')
+        if if_generation_match is not None and self.generation != if_generation_match:
+            raise exceptions.PreconditionFailed(f'Generation mismatch: {self.name}')
+        return io.BytesIO(self._object[0])
+
+class FakeBucket:
+    def __init__(self, name='bench-bucket', rpc_latency=0.0):
+        self.name = name
+        self.rpc_latency = rpc_latency
+        self.lock = threading.Lock()
+        # object name -> (bytes, generation)
+        self.objects = {}
+        self.generation = 0
+
+    def rpc(self):
+        if self.rpc_latency:
+            time.sleep(self.rpc_latency)
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name, **kwargs):
+        self.rpc()
+        return FakeBlob(self, name) if name in self.objects else None
+
+def fake_token(uid):
+    return f'bench-token:{uid}'
+
+def verify_fake_token(token):
+    """Claims for a token made by ``fake_token``; the stand-in for auth.verify_id_token."""
+    prefix, _, uid = token.partition(':')
+    if prefix != 'bench-token' or not uid:
+        raise ValueError('Invalid token')
+    now = time.time()
+    return {'uid': uid, 'iat': now, 'exp': now + 3600}
+
+def resume_pdf(lines):
+    """A one-page PDF whose text PyPDF2 can extract, built without a PDF library."""
+    text = ['BT', '/F1 11 Tf', '50 760 Td', '14 TL']
+    for line in lines:
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        text.append(f'({escaped}) Tj T*')
+    text.append('ET')
+    stream = '\n'.join(text).encode('latin-1', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b'%010d 00000 n \n' % offset
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(pdf)
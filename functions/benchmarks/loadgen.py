@@ -0,0 +1,351 @@
+"""
+Load generator: N concurrent simulated candidates against a running backend.
+
+Each candidate loops through interviews until its step ends: start a session,
+then for every turn think, answer and poll the session, then end it. Think
+time, answer length and resume size are configurable. Concurrency is raised
+in steps (--candidates 5,10,20,40), and each step reports throughput,
+per-endpoint latency percentiles and histograms, and errors by cause. The
+step where throughput stops rising while latency climbs is where the backend
+saturates.
+
+Targets:
+  functions     the Cloud Functions, through Hosting rewrites (/api/start-session, ...)
+                or the Functions emulator (--path-template '/PROJECT/us-central1/{function}').
+                Resumes are uploaded to Storage under resumes/{uid}/ as the frontend does.
+  orchestrator  the FastAPI app (uvicorn mcp_orchestrator.app.main:app). Resumes are
+                served by the load generator itself, which the backend must be able to reach.
+
+Auth is a Firebase ID token: pass one with --token (shared by every candidate),
+or pass --api-key to sign each candidate up as an anonymous user (use --auth-url
+for the Auth emulator). Tokens last an hour, so keep single runs shorter than that.
+
+    python benchmarks/loadgen.py --target functions --base-url https://PROJECT.web.app \\
+        --api-key KEY --bucket PROJECT.appspot.com --candidates 5,10,20 --step-sec 120
+    python benchmarks/loadgen.py --target orchestrator --base-url http://localhost:8000 \\
+        --token "$ID_TOKEN" --candidates 4,8,16 --think-sec 5
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from e2e import ANSWER, JOB_DESCRIPTION, RESUME_LINES, ROLE, percentile  # noqa: E402
+from fakes import resume_pdf  # noqa: E402
+
+# Upper bounds of the latency histogram buckets, in ms
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, math.inf)
+ANSWER_WORDS = ANSWER.split()
+
+def answer_text(words):
+    return ' '.join(ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(words))
+
+def resume_bytes(lines, index):
+    body = [RESUME_LINES[i % len(RESUME_LINES)] for i in range(lines)]
+    return resume_pdf([f'LOAD CANDIDATE {index}', *body])
+
+def token_uid(token):
+    """The uid in an ID token's payload, read without verifying it."""
+    payload = token.split('.')[1]
+    claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    return claims.get('user_id') or claims['sub']
+
+class Stats:
+    """Latencies and outcomes of one step, per endpoint."""
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.defaultdict(collections.Counter)
+        self.sessions = 0
+
+    def record(self, endpoint, elapsed_ms, error=None):
+        if error is None:
+            self.latencies[endpoint].append(elapsed_ms)
+        else:
+            self.errors[endpoint][error] += 1
+
+class Candidate:
+    """One simulated candidate: an identity, a resume and the interview loop."""
+
+    def __init__(self, index, args, client, stats, resumes):
+        self.index = index
+        self.args = args
+        self.client = client
+        self.stats = stats
+        self.resumes = resumes
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.token = args.token
+        self.uid = None
+        self.resume_url = args.resume_url
+
+    def path(self, function):
+        return self.args.base_url + self.args.path_template.format(
+            function=function, endpoint=function.replace('_', '-'))
+
+    async def request(self, endpoint, method, url, **kwargs):
+        headers = {'Authorization': f'Bearer {self.token}', **kwargs.pop('headers', {})}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.TimeoutException:
+            self.stats.record(endpoint, None, 'timeout')
+            return None
+        except httpx.HTTPError as e:
+            self.stats.record(endpoint, None, type(e).__name__)
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            self.stats.record(endpoint, elapsed_ms, f'HTTP {response.status_code}')
+            return None
+        self.stats.record(endpoint, elapsed_ms)
+        return response
+
+    def session_id(self, response):
+        session_id = response.json().get('session_id') if response is not None else None
+        if response is not None and not session_id:
+            self.stats.record('start_session', None, 'no session_id')
+        return session_id
+
+    async def sign_in(self):
+        if self.token is None:
+            response = await self.client.post(
+                f'{self.args.auth_url}/v1/accounts:signUp', params={'key': self.args.api_key},
+                json={'returnSecureToken': True})
+            response.raise_for_status()
+            self.token = response.json()['idToken']
+        self.uid = token_uid(self.token)
+
+    async def upload_resume(self):
+        if self.resume_url:
+            return
+        pdf = resume_bytes(self.args.resume_lines, self.index)
+        name = f'resumes/{self.uid}/loadgen-{self.index}.pdf'
+        if self.args.target == 'functions':
+            response = await self.client.post(
+                f'{self.args.storage_url}/v0/b/{self.args.bucket}/o',
+                params={'uploadType': 'media', 'name': name}, content=pdf,
+                headers={'Authorization': f'Firebase {self.token}', 'Content-Type': 'application/pdf'})
+            response.raise_for_status()
+            self.resume_url = f'gs://{self.args.bucket}/{name}'
+        else:
+            self.resume_url = self.resumes.add(f'loadgen-{self.index}.pdf', pdf)
+
+    async def think(self):
+        mean = self.args.think_sec
+        if mean > 0:
+            await asyncio.sleep(self.rng.uniform(mean * (1 - self.args.think_jitter), mean * (1 + self.args.think_jitter)))
+
+    def answer(self):
+        low, high = self.args.answer_words
+        return answer_text(self.rng.randint(low, high))
+
+    async def interview(self):
+        if self.args.target == 'functions':
+            await self._functions_interview()
+        else:
+            await self._orchestrator_interview()
+
+    async def _functions_interview(self):
+        response = await self.request('start_session', 'POST', self.path('start_session'), json={
+            'resume_url': self.resume_url, 'role': ROLE, 'job_description': JOB_DESCRIPTION})
+        session_id = self.session_id(response)
+        if session_id is None:
+            return
+        etag = None
+        for _ in range(self.args.turns):
+            await self.think()
+            await self.request('submit_response', 'POST', self.path('submit_response'),
+                               json={'session_id': session_id, 'response': self.answer()})
+            polled = await self.request(
+                'get_session', 'GET', self.path('get_session'),
+                params={'session_id': session_id, 'fields': 'role,current_question,response_history'},
+                headers={'If-None-Match': etag} if etag else {})
+            if polled is not None:
+                etag = polled.headers.get('ETag', etag)
+        await self.request('end_session', 'POST', self.path('end_session'), json={'session_id': session_id})
+        self.stats.sessions += 1
+
+    async def _orchestrator_interview(self):
+        base = self.args.base_url
+        response = await self.request('start_session', 'POST', f'{base}/start-session', data={
+            'resume_url': self.resume_url, 'role': ROLE, 'job_description': JOB_DESCRIPTION, 'user_id': self.uid})
+        session_id = self.session_id(response)
+        if session_id is None:
+            return
+        for _ in range(self.args.turns):
+            await self.think()
+            await self.request('submit_response', 'POST', f'{base}/submit-response',
+                               json={'session_id': session_id, 'response': self.answer(), 'user_id': self.uid})
+            await self.request('next_question', 'POST', f'{base}/next-question',
+                               params={'session_id': session_id, 'user_id': self.uid})
+            await self.request('get_session', 'GET', f'{base}/session/{session_id}', params={'user_id': self.uid})
+        self.stats.sessions += 1
+
+class ResumeServer:
+    """Serves generated resumes over HTTP for backends that download them by URL."""
+
+    def __init__(self, host, port, advertised):
+        self.files = {}
+        files = self.files
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = files.get(self.path.lstrip('/'))
+                self.send_response(200 if body else 404)
+                self.send_header('Content-Type', 'application/pdf')
+                self.send_header('Content-Length', str(len(body or b'')))
+                self.end_headers()
+                self.wfile.write(body or b'')
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.base_url = advertised or f'http://{host}:{self._server.server_address[1]}'
+        threading.Thread(target=self._server.serve_forever, name='resume-server', daemon=True).start()
+
+    def add(self, name, body):
+        self.files[quote(name)] = body
+        return f'{self.base_url}/{quote(name)}'
+
+async def run_step(args, candidates, resumes):
+    stats = Stats()
+    limits = httpx.Limits(max_connections=candidates * 2, max_keepalive_connections=candidates * 2)
+    async with httpx.AsyncClient(timeout=args.timeout_sec, limits=limits) as client:
+        deadline = time.monotonic() + args.step_sec
+
+        async def candidate_loop(index):
+            candidate = Candidate(index, args, client, stats, resumes)
+            # Spread arrivals over the ramp so candidates do not move in lockstep
+            await asyncio.sleep(args.ramp_sec * index / max(1, candidates))
+            try:
+                await candidate.sign_in()
+                await candidate.upload_resume()
+            except httpx.HTTPError as e:
+                stats.record('setup', None, type(e).__name__)
+                return
+            while time.monotonic() < deadline:
+                await candidate.interview()
+
+        started = time.monotonic()
+        await asyncio.gather(*(candidate_loop(index) for index in range(candidates)))
+        elapsed = time.monotonic() - started
+    return stats, elapsed
+
+def histogram(samples, width=30):
+    counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+    for sample in samples:
+        counts[next(i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if sample <= bound)] += 1
+    peak = max(counts) or 1
+    lines = []
+    for bound, count in zip(HISTOGRAM_BUCKETS_MS, counts):
+        label = f'<= {bound:g} ms' if bound != math.inf else '> 30000 ms'
+        lines.append(f'      {label:>12} {count:>6} {"#" * round(width * count / peak)}')
+    return '\n'.join(lines)
+
+def report(candidates, stats, elapsed, show_histograms):
+    completed = sum(len(v) for v in stats.latencies.values())
+    failed = sum(sum(c.values()) for c in stats.errors.values())
+    summary = {
+        'candidates': candidates,
+        'elapsed_sec': round(elapsed, 1),
+        'sessions': stats.sessions,
+        'requests_per_sec': round(completed / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(failed / (completed + failed), 4) if completed + failed else 0.0,
+        'endpoints': {},
+    }
+    print(f"\n== {candidates} candidates: {completed} ok, {failed} failed in {elapsed:.0f}s "
+          f"({summary['requests_per_sec']} req/s, {stats.sessions} sessions completed)")
+    print(f"   {'endpoint':<18}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  errors")
+    for endpoint in sorted(set(stats.latencies) | set(stats.errors)):
+        samples = sorted(stats.latencies[endpoint])
+        errors = dict(stats.errors[endpoint])
+        row = {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 50), 1),
+            'p95_ms': round(percentile(samples, 95), 1),
+            'p99_ms': round(percentile(samples, 99), 1),
+            'max_ms': round(samples[-1], 1) if samples else float('nan'),
+            'errors': errors,
+        }
+        summary['endpoints'][endpoint] = row
+        error_text = ', '.join(f'{cause}: {count}' for cause, count in errors.items()) or '-'
+        print(f"   {endpoint:<18}{row['count']:>6}{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}"
+              f"{row['p99_ms']:>9.0f}{row['max_ms']:>9.0f}  {error_text}")
+        if show_histograms and samples:
+            print(histogram(samples))
+    return summary
+
+def parse_range(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('functions', 'orchestrator'), required=True)
+    parser.add_argument('--base-url', required=True)
+    parser.add_argument('--path-template', default='/api/{endpoint}',
+                        help='functions target: URL path per endpoint, with {endpoint} or {function}')
+    parser.add_argument('--candidates', default='5,10,20', help='comma-separated concurrency steps')
+    parser.add_argument('--step-sec', type=float, default=60.0, help='duration of each step')
+    parser.add_argument('--ramp-sec', type=float, default=10.0, help='spread candidate arrivals over this long')
+    parser.add_argument('--turns', type=int, default=3, help='answers per interview')
+    parser.add_argument('--think-sec', type=float, default=10.0, help='mean pause before each answer')
+    parser.add_argument('--think-jitter', type=float, default=0.5, help='think time varies by +/- this fraction')
+    parser.add_argument('--answer-words', type=parse_range, default=(60, 200), help='answer length range, e.g. 60-200')
+    parser.add_argument('--resume-lines', type=int, default=40, help='lines of text in each generated resume')
+    parser.add_argument('--resume-url', help='use this resume for every candidate instead of generating one')
+    parser.add_argument('--timeout-sec', type=float, default=120.0, help='per-request timeout')
+    parser.add_argument('--token', help='Firebase ID token shared by every candidate')
+    parser.add_argument('--api-key', help='Firebase web API key; signs each candidate up anonymously')
+    parser.add_argument('--auth-url', default='https://identitytoolkit.googleapis.com',
+                        help='Auth REST base, e.g. http://127.0.0.1:9099/identitytoolkit.googleapis.com')
+    parser.add_argument('--bucket', help='functions target: Storage bucket for uploaded resumes')
+    parser.add_argument('--storage-url', default='https://firebasestorage.googleapis.com',
+                        help='Storage REST base, e.g. http://127.0.0.1:9199 for the emulator')
+    parser.add_argument('--resume-host', default='127.0.0.1', help='orchestrator target: bind address for resumes')
+    parser.add_argument('--resume-port', type=int, default=0)
+    parser.add_argument('--resume-base-url', help='orchestrator target: resume server URL as the backend sees it')
+    parser.add_argument('--histograms', action='store_true', help='print a latency histogram per endpoint')
+    parser.add_argument('--output', type=Path, help='write every step as JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.token and not args.api_key:
+        parser.error('pass --token or --api-key')
+    if args.target == 'functions' and not args.resume_url and not args.bucket:
+        parser.error('the functions target needs --bucket (or --resume-url)')
+    args.base_url = args.base_url.rstrip('/')
+
+    resumes = None
+    if args.target == 'orchestrator' and not args.resume_url:
+        resumes = ResumeServer(args.resume_host, args.resume_port, args.resume_base_url)
+
+    steps = []
+    for candidates in (int(value) for value in args.candidates.split(',')):
+        stats, elapsed = asyncio.run(run_step(args, candidates, resumes))
+        steps.append(report(candidates, stats, elapsed, args.histograms))
+
+    print(f"\n{'candidates':>10}{'req/s':>9}{'errors':>9}{'worst p95 ms':>14}")
+    for step in steps:
+        worst = max((row['p95_ms'] for row in step['endpoints'].values() if row['count']), default=float('nan'))
+        print(f"{step['candidates']:>10}{step['requests_per_sec']:>9.2f}{step['error_rate']:>9.1%}{worst:>14.0f}")
+    if args.output:
+        args.output.write_text(json.dumps({'target': args.target, 'steps': steps}, indent=2) + '\n')
+
+if __name__ == '__main__':
+    main()
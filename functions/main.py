@@ -2,33 +2,142 @@
 # To get started, simply uncomment the below code or create your own.
 # Deploy with `firebase deploy`
 
+# Every function in this file runs in its own instance but imports the whole
+# module, so module import is part of every cold start. Only what all four
+# endpoints need is imported here; the agent stack (openai, httpx, tiktoken),
+# PyPDF2 and Cloud Storage are imported by the endpoints that use
+# them, and all clients are created on first use.
 from firebase_functions import https_fn
-from firebase_admin import initialize_app, storage, firestore, auth
-import functions_framework
-from typing import Dict, Optional
+from firebase_admin import initialize_app, firestore, auth
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, TypeVar
+import asyncio
+import functools
+import hashlib
+import hmac
 import json
 import os
+import re
+import threading
 from dotenv import load_dotenv
-import requests
-import asyncio
 from datetime import datetime
 
-# Initialize Firebase Admin
-app = initialize_app()
-db = firestore.client()
-bucket = storage.bucket()
-
 # Load environment variables
 load_dotenv()
 
-# Import our existing agent classes
-from mcp_orchestrator.app.agents.base import InterviewerAgent, ScorerAgent, FeedbackAgent, QuestionRequest, ScoringRequest, FeedbackRequest
-from mcp_orchestrator.app.utils.pdf_parser import parse_pdf_to_text, clean_resume_text
-
-# Initialize agents
-interviewer_agent = InterviewerAgent()
-scorer_agent = ScorerAgent()
-feedback_agent = FeedbackAgent()
+if TYPE_CHECKING:
+    from mcp_orchestrator.app.agents.base import InterviewerAgent, ScorerAgent, FeedbackAgent, QuestionRequest
+
+from mcp_orchestrator.app.utils.firestore_sessions import (
+    CONTEXT_FIELDS, PRIVATE_FIELDS, PROJECTION_BASE_FIELDS, SCHEMA_VERSION, TurnConflictError, append_question,
+    commit_turn, context_key, context_ref, create_session, ensure_context, has_score_aggregates, header_view, load_session,
+    load_turns, load_turns_page, schema_version, score_aggregates, score_summary, turn_count
+)
+from mcp_orchestrator.app.utils.firestore_usage import add_usage, record_usage, usage_prometheus
+from mcp_orchestrator.app.utils.timing import request_timer, span, start_request
+from mcp_orchestrator.app.utils.usage import summarize, track_calls
+
+# Default for requests that don't pass evaluation_mode: 'separate' or 'combined'
+EVALUATION_MODE = os.getenv('EVALUATION_MODE', 'separate')
+
+# Bearer token the metrics endpoint requires; without one the endpoint is disabled
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Largest response_history page get_session returns
+MAX_HISTORY_PAGE_SIZE = 50
+# Longest role start_session accepts, in characters
+MAX_ROLE_LENGTH = 100
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+T = TypeVar('T')
+_lazy_lock = threading.RLock()
+
+def lazy(factory: Callable[[], T]) -> Callable[[], T]:
+    """Call ``factory`` once, on first use, and return the same value after that."""
+    value = []
+
+    def get() -> T:
+        if not value:
+            # Reentrant: factories may call other lazy getters
+            with _lazy_lock:
+                if not value:
+                    value.append(factory())
+        return value[0]
+
+    return get
+
+@lazy
+def get_app():
+    # Initialize Firebase Admin
+    return initialize_app()
+
+@lazy
+def get_db():
+    get_app()
+    return firestore.client()
+
+@lazy
+def get_bucket():
+    from firebase_admin import storage
+    get_app()
+    return storage.bucket()
+
+class Agents(NamedTuple):
+    interviewer: 'InterviewerAgent'
+    scorer: 'ScorerAgent'
+    feedback: 'FeedbackAgent'
+
+@lazy
+def get_agents() -> Agents:
+    """Import and build the agents, once per instance."""
+    from mcp_orchestrator.app.agents.base import InterviewerAgent, ScorerAgent, FeedbackAgent
+    from mcp_orchestrator.app.utils.memo import MEMO_PERSISTENT, agent_memo, FirestoreMemoStore
+
+    # Opt-in: scores and feedback for retried submits are shared across instances
+    if MEMO_PERSISTENT:
+        agent_memo.persistent = FirestoreMemoStore(get_db().collection('agent_memo'))
+    return Agents(InterviewerAgent(), ScorerAgent(), FeedbackAgent())
+
+async def ensure_agents_initialized():
+    """Initialize the agents once per instance; they share the runtime's pooled client."""
+    for agent in get_agents():
+        if agent.openai_client is None:
+            await agent.initialize()
+
+async def generate_next_question(session_ref, session_data: Dict) -> str:
+    """Generate a session's next question outside a request, e.g. for speculative precompute."""
+    await ensure_agents_initialized()
+    return await get_agents().interviewer.generate_question(await next_question_inputs(session_ref, session_data))
+
+@lazy
+def get_question_speculator():
+    from mcp_orchestrator.app.utils.speculation import QuestionSpeculator
+
+    # Precomputes each session's next question while the candidate answers
+    return QuestionSpeculator(generate_next_question, record_usage=functools.partial(record_usage, get_db()))
+
+@lazy
+def get_resume_ingest():
+    from mcp_orchestrator.app.utils.resume_ingest import ResumeIngest
+
+    # Reads uploaded resumes straight from our bucket, under a size cap and deadline
+    return ResumeIngest(get_bucket())
+
+@lazy
+def get_resume_cache():
+    from mcp_orchestrator.app.utils.resume_cache import ResumeCache
+
+    # Cleaned resume text keyed by a hash of the PDF bytes
+    return ResumeCache(get_db().collection('resume_cache'), get_db().collection('resume_url_index'))
+
+@lazy
+def get_token_cache():
+    from mcp_orchestrator.app.utils.token_cache import VerifiedTokenCache, prefetch_firebase_certs
+
+    # The frontend resends the same ID token until it is refreshed; verify it once per instance
+    return VerifiedTokenCache(
+        lambda token: auth.verify_id_token(token, app=get_app()),
+        prefetch=lambda: prefetch_firebase_certs(get_app())
+    )
 
 def verify_auth_token(req: https_fn.Request) -> str:
     """Verify Firebase auth token from request headers."""
@@ -37,14 +146,150 @@ def verify_auth_token(req: https_fn.Request) -> str:
     
     token = req.headers.get('Authorization').split('Bearer ')[1]
     try:
-        decoded_token = auth.verify_id_token(token)
+        with span('auth'):
+            decoded_token = get_token_cache().verify(token)
         return decoded_token['uid']
     except Exception as e:
         raise ValueError('Invalid authorization token')
 
+def parse_resume(pdf_bytes: bytes) -> str:
+    """Extract and clean the text of a resume PDF."""
+    from mcp_orchestrator.app.utils.pdf_parser import parse_pdf_to_text, clean_resume_text
+
+    with span('pdf_parse'):
+        return clean_resume_text(parse_pdf_to_text(pdf_bytes))
+
+def timed(handler: Callable[[https_fn.Request], https_fn.Response]) -> Callable[[https_fn.Request], https_fn.Response]:
+    """
+    Time the stages of each request to ``handler``.
+
+    The spans come back in a ``Server-Timing`` header and as one structured
+    log line. For streamed responses only the stages before the first event
+    are included.
+    """
+    @functools.wraps(handler)
+    def wrapper(req: https_fn.Request) -> https_fn.Response:
+        timer = start_request(handler.__name__)
+        if timer is None:
+            return handler(req)
+        try:
+            response = handler(req)
+            response.headers['Server-Timing'] = timer.server_timing()
+            timer.log(status=response.status_code)
+            return response
+        finally:
+            request_timer.set(None)
+
+    return wrapper
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated ``fields`` projection; None means every field."""
+    if value is None:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    invalid = [field for field in fields if not FIELD_NAME.match(field)]
+    if invalid:
+        raise ValueError(f"Invalid fields: {', '.join(invalid)}")
+    return fields
+
+def session_etag(snapshot, *variant) -> str:
+    """
+    Validator for one representation of a session.
+
+    Every write to a session, including each recorded turn, updates the
+    header in the same commit, so the header's update time versions the whole
+    session. The query parameters that shaped the response are mixed in so
+    different projections and pages never share a tag.
+    """
+    version = json.dumps([snapshot.update_time.isoformat(), *variant])
+    return '"' + hashlib.sha256(version.encode('utf-8')).hexdigest()[:32] + '"'
+
+def etag_matches(req: https_fn.Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this representation."""
+    header = req.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+def wants_combined_evaluation(data: Dict) -> bool:
+    """Whether a submit should use the single-call evaluator instead of separate score and feedback calls."""
+    return data.get('evaluation_mode', EVALUATION_MODE) == 'combined'
+
+def next_question_request(session_data: Dict) -> 'QuestionRequest':
+    """Build the interviewer request for the question following the ones already asked."""
+    from mcp_orchestrator.app.agents.base import QuestionRequest
+
+    previous_questions = session_data['questions_asked']
+    # Patch: ensure previous_questions is a list of dicts
+    if previous_questions and isinstance(previous_questions[0], str):
+        previous_questions = [{"question": q, "response": ""} for q in previous_questions]
+    return QuestionRequest(
+        role=session_data['role'],
+        # Only read when there is no digest, which otherwise stands in for them
+        resume_text=session_data.get('resume_text', ''),
+        job_description=session_data.get('job_description', ''),
+        previous_questions=previous_questions,
+        context_digest=session_data.get('context_digest')
+    )
+
+async def next_question_inputs(session_ref, session_data: Dict) -> 'QuestionRequest':
+    """
+    Like next_question_request, first reading the interview inputs it needs
+    from the context document: the digest, or the resume and job description
+    for sessions without one.
+    """
+    if 'context_digest' not in session_data:
+        with span('firestore_read'):
+            await asyncio.to_thread(ensure_context, session_ref, session_data, ('context_digest',))
+    if not session_data.get('context_digest') and 'resume_text' not in session_data:
+        with span('firestore_read'):
+            await asyncio.to_thread(ensure_context, session_ref, session_data)
+    return next_question_request(session_data)
+
+def record_turn(session_ref, session_data: Dict, question: str, response_text: str,
+                score: float, feedback: str, next_question: str,
+                breakdown: Optional[Dict[str, float]] = None) -> None:
+    """Append an evaluated answer to the session and advance to the next question."""
+    turn = {
+        'question': question,
+        'response': response_text,
+        'score': score,
+        'feedback': feedback,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    if breakdown is not None:
+        turn['breakdown'] = breakdown
+
+    # Raises TurnConflictError if a concurrent submit recorded this turn first
+    index = turn_count(session_data)
+    with span('firestore_write'):
+        commit_turn(get_db(), session_ref, index, turn, next_question, context_hash=session_data.get('context_key'))
+
+    # Keep the local copy in step for speculative precompute
+    session_data['turn_count'] = index + 1
+    session_data['current_question'] = next_question
+    session_data['questions_asked'] = append_question(session_data['questions_asked'], next_question)
+    session_data.pop('pending_question', None)
+
+def save_usage(session_ref, user_id: str, calls) -> None:
+    """Record a request's LLM usage; accounting never fails a turn that was already recorded."""
+    try:
+        with span('firestore_write'):
+            record_usage(get_db(), session_ref, user_id, summarize(calls))
+    except Exception as e:
+        print(json.dumps({'severity': 'WARNING', 'message': 'LLM usage not recorded', 'error': str(e)}))
+
 @https_fn.on_request(memory=1024,timeout_sec=540)
+@timed
 def start_session(req: https_fn.Request) -> https_fn.Response:
     """Start a new interview session."""
+    from mcp_orchestrator.app.agents.base import QuestionRequest, DigestRequest
+    from mcp_orchestrator.app.utils.llm_limiter import LLMOverloadedError
+    from mcp_orchestrator.app.utils.runtime import runtime
+
+    agents = get_agents()
+    calls = track_calls()
     try:
         # Verify auth token
         user_id = verify_auth_token(req)
@@ -69,12 +314,23 @@ def start_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        # Download and process the resume
+        if not isinstance(role, str) or len(role) > MAX_ROLE_LENGTH:
+            return https_fn.Response(
+                json.dumps({"error": f"role must be a string of at most {MAX_ROLE_LENGTH} characters"}),
+                status=400,
+                content_type='application/json'
+            )
+
+        # Download and process the resume, unless this PDF was already parsed
         try:
-            response = requests.get(resume_url)
-            response.raise_for_status()
-            resume_text = parse_pdf_to_text(response.content)
-            cleaned_resume = clean_resume_text(resume_text)
+            resume_ingest = get_resume_ingest()
+            resume_ingest.check_access(resume_url, user_id)
+            cleaned_resume = get_resume_cache().load(resume_url, resume_ingest.fetch, parse_resume)
+            print(json.dumps({
+                'severity': 'INFO',
+                'message': 'resume cache',
+                **get_resume_cache().stats()
+            }))
         except Exception as e:
             return https_fn.Response(
                 json.dumps({"error": f"Failed to process resume: {str(e)}"}),
@@ -82,49 +338,66 @@ def start_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        # Create a new session in Firestore
-        session_ref = db.collection('sessions').document()
-        session_data = {
+        # Create a new session in Firestore: a slim header polled by the
+        # frontend, plus a context document holding the interview inputs
+        session_ref = get_db().collection('sessions').document()
+        context = {
+            'job_description': job_description,
+            'resume_text': cleaned_resume
+        }
+        header = {
             'user_id': user_id,  # Use verified user_id from token
             'role': role,
-            'job_description': job_description,
-            'resume_text': cleaned_resume,
             'current_question': None,
             'questions_asked': [],
-            'responses': [],
-            'scores': [],
-            'feedback': [],
-            'response_history': [],  # Add this field for frontend compatibility
-            'status': 'active'
+            'status': 'active',
+            'context_key': context_key(context)
         }
-        session_ref.set(session_data)
+        with span('firestore_write'):
+            create_session(get_db(), session_ref, header, context)
+        session_data = {**header, **context}
 
         async def generate_first_question():
-            # Initialize the interviewer agent
-            await interviewer_agent.initialize()
+            await ensure_agents_initialized()
+
+            # Condense the resume and job description once for every later turn
+            context_digest = await agents.interviewer.digest_context(DigestRequest(
+                role=role,
+                resume_text=cleaned_resume,
+                job_description=job_description
+            ))
 
             # Generate first question
             question_request = QuestionRequest(
                 role=role,
                 resume_text=cleaned_resume,
                 job_description=job_description,
-                previous_questions=[]
+                previous_questions=[],
+                context_digest=context_digest
             )
-            first_question = await interviewer_agent.generate_question(question_request)
-
-            # Cleanup the agent
-            await interviewer_agent.cleanup()
-            return first_question
-
-        # Run the async code in a synchronous context
-        first_question = asyncio.run(generate_first_question())
-
-        # Update session with first question
-        session_ref.update({
+            return context_digest, await agents.interviewer.generate_question(question_request)
+
+        # Run the async code on the process-lifetime event loop
+        context_digest, first_question = runtime.run(generate_first_question())
+
+        # Update session with the digest and first question
+        session_data['context_digest'] = context_digest
+        session_data['context_key'] = context_key(session_data)
+        session_data['questions_asked'] = [first_question]
+        batch = get_db().batch()
+        batch.update(context_ref(session_ref), {'context_digest': context_digest})
+        batch.update(session_ref, {
             'current_question': first_question,
             'questions_asked': [first_question],
-            'response_history': []  # Initialize the response history array
+            'context_key': session_data['context_key'],
+            'updated_at': firestore.SERVER_TIMESTAMP
         })
+        add_usage(batch, get_db(), session_ref, user_id, summarize(calls))
+        with span('firestore_write'):
+            batch.commit()
+
+        # Start on the second question while the candidate answers the first
+        get_question_speculator().launch(session_ref.id, session_ref, session_data, user_id)
 
         return https_fn.Response(
             json.dumps({
@@ -134,6 +407,13 @@ def start_session(req: https_fn.Request) -> https_fn.Response:
             content_type='application/json'
         )
 
+    except LLMOverloadedError as e:
+        return https_fn.Response(
+            json.dumps({"error": str(e)}),
+            status=429,
+            headers={'Retry-After': str(e.retry_after)},
+            content_type='application/json'
+        )
     except ValueError as e:
         return https_fn.Response(
             json.dumps({"error": str(e)}),
@@ -148,8 +428,18 @@ def start_session(req: https_fn.Request) -> https_fn.Response:
         )
 
 @https_fn.on_request(memory=1024,timeout_sec=540)
+@timed
 def submit_response(req: https_fn.Request) -> https_fn.Response:
     """Submit and evaluate a response."""
+    from mcp_orchestrator.app.agents.base import ScoringRequest, FeedbackRequest, EvaluationError
+    from mcp_orchestrator.app.utils.llm_limiter import LLMOverloadedError, llm_limiter
+    from mcp_orchestrator.app.utils.llm_scheduler import llm_scheduler
+    from mcp_orchestrator.app.utils.memo import agent_memo
+    from mcp_orchestrator.app.utils.runtime import runtime
+    from mcp_orchestrator.app.utils.stage_executor import StageExecutor
+
+    agents = get_agents()
+    calls = track_calls()
     try:
         # Verify auth token
         user_id = verify_auth_token(req)
@@ -165,18 +455,17 @@ def submit_response(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        # Get session data
-        session_ref = db.collection('sessions').document(session_id)
-        session = session_ref.get()
+        # Get session header and context, migrating older sessions on the way
+        session_ref = get_db().collection('sessions').document(session_id)
+        with span('firestore_read'):
+            session_data = load_session(get_db(), session_ref)
         
-        if not session.exists:
+        if session_data is None:
             return https_fn.Response(
                 json.dumps({"error": "Session not found"}),
                 status=404,
                 content_type='application/json'
             )
-
-        session_data = session.to_dict()
         
         # Verify user owns this session
         if session_data['user_id'] != user_id:
@@ -188,82 +477,107 @@ def submit_response(req: https_fn.Request) -> https_fn.Response:
 
         current_question = session_data['current_question']
 
-        async def process_response():
-            # Initialize agents
-            await scorer_agent.initialize()
-            await feedback_agent.initialize()
-            await interviewer_agent.initialize()
-
-            # Score the response
-            scoring_request = ScoringRequest(
-                question=current_question,
-                response=response_text,
-                role=session_data['role'],
-                job_description=session_data['job_description']
-            )
-            score = await scorer_agent.score_response(scoring_request)
-
-            # Get feedback
-            feedback_request = FeedbackRequest(
-                question=current_question,
-                response=response_text,
-                score=score,
-                role=session_data['role'],
-                job_description=session_data['job_description']
-            )
-            feedback = await feedback_agent.generate_feedback(feedback_request)
-
-            # Generate next question
-            previous_questions = session_data['questions_asked']
-            # Patch: ensure previous_questions is a list of dicts
-            if previous_questions and isinstance(previous_questions[0], str):
-                previous_questions = [{"question": q, "response": ""} for q in previous_questions]
-            question_request = QuestionRequest(
-                role=session_data['role'],
-                resume_text=session_data['resume_text'],
-                job_description=session_data['job_description'],
-                previous_questions=previous_questions
-            )
-            next_question = await interviewer_agent.generate_question(question_request)
-
-            # Cleanup agents
-            await scorer_agent.cleanup()
-            await feedback_agent.cleanup()
-            await interviewer_agent.cleanup()
-
-            return score, feedback, next_question
-
-        # Run the async code in a synchronous context
-        score, feedback, next_question = asyncio.run(process_response())
-
-        # Update session data
-        session_data['responses'].append(response_text)
-        session_data['scores'].append(score)
-        session_data['feedback'].append(feedback)
-        session_data['current_question'] = next_question
-        session_data['questions_asked'].append(next_question)
-
-        # Update response history for frontend
-        session_data['response_history'].append({
-            'question': current_question,
-            'response': response_text,
-            'score': score,
-            'feedback': feedback,
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        combined_evaluation = wants_combined_evaluation(data)
+        scoring_request = ScoringRequest(
+            question=current_question,
+            response=response_text,
+            role=session_data['role']
+        )
 
-        # Update Firestore
-        session_ref.set(session_data)
+        async def process_response():
+            await ensure_agents_initialized()
+
+            async def score_stage():
+                return await agents.scorer.score_response(scoring_request)
+
+            async def feedback_stage(score):
+                feedback_request = FeedbackRequest(
+                    question=current_question,
+                    response=response_text,
+                    score=score,
+                    role=session_data['role']
+                )
+                return await agents.feedback.generate_feedback(feedback_request)
+
+            async def evaluate_stage():
+                # One structured call for score, breakdown and feedback
+                try:
+                    evaluation = await agents.scorer.evaluate_response(scoring_request)
+                    return evaluation.score, evaluation.feedback, evaluation.breakdown.dict()
+                except EvaluationError:
+                    # Fall back to the separate score and feedback calls
+                    score = await score_stage()
+                    return score, await feedback_stage(score), None
+
+            async def next_question_stage():
+                # The next question only depends on the questions asked so far,
+                # so it is usually precomputed; otherwise it runs alongside the
+                # score -> feedback chain
+                pending = await get_question_speculator().take(session_id, session_ref, session_data)
+                if pending is not None:
+                    return pending
+                return await agents.interviewer.generate_question(await next_question_inputs(session_ref, session_data))
+
+            executor = StageExecutor()
+            if combined_evaluation:
+                executor.add('evaluate', evaluate_stage)
+            else:
+                executor.add('score', score_stage)
+                executor.add('feedback', feedback_stage, deps=['score'])
+            executor.add('next_question', next_question_stage)
+
+            results = await executor.run()
+
+            print(json.dumps({
+                'severity': 'INFO',
+                'message': 'submit_response stages',
+                'session_id': session_id,
+                **executor.report(),
+                'connection_pool': runtime.metrics.snapshot(),
+                'agent_memo': agent_memo.stats(),
+                'llm_limiter': llm_limiter.stats(),
+                'llm_scheduler': llm_scheduler.stats(),
+                'llm_usage': summarize(calls),
+                'auth_tokens': get_token_cache().stats()
+            }))
+
+            if combined_evaluation:
+                score, feedback, breakdown = results['evaluate']
+            else:
+                score, feedback, breakdown = results['score'], results['feedback'], None
+            return score, feedback, breakdown, results['next_question']
+
+        # Run the async code on the process-lifetime event loop
+        score, feedback, breakdown, next_question = runtime.run(process_response())
+
+        record_turn(session_ref, session_data, current_question, response_text, score, feedback, next_question,
+                    breakdown=breakdown)
+        save_usage(session_ref, user_id, calls)
+        get_question_speculator().launch(session_id, session_ref, session_data, user_id)
 
         return https_fn.Response(
             json.dumps({
                 'score': score,
+                'breakdown': breakdown,
                 'feedback': feedback,
                 'next_question': next_question
             }),
             content_type='application/json'
         )
 
+    except TurnConflictError as e:
+        return https_fn.Response(
+            json.dumps({"error": str(e)}),
+            status=409,
+            content_type='application/json'
+        )
+    except LLMOverloadedError as e:
+        return https_fn.Response(
+            json.dumps({"error": str(e)}),
+            status=429,
+            headers={'Retry-After': str(e.retry_after)},
+            content_type='application/json'
+        )
     except ValueError as e:
         return https_fn.Response(
             json.dumps({"error": str(e)}),
@@ -278,6 +592,147 @@ def submit_response(req: https_fn.Request) -> https_fn.Response:
         )
 
 @https_fn.on_request(memory=1024,timeout_sec=540)
+@timed
+def submit_response_stream(req: https_fn.Request) -> https_fn.Response:
+    """Submit a response and stream the score, feedback and next question as server-sent events."""
+    from mcp_orchestrator.app.agents.base import ScoringRequest, FeedbackRequest, EvaluationError
+    from mcp_orchestrator.app.utils.runtime import runtime
+    from mcp_orchestrator.app.utils.sse import format_sse, merge_event_streams
+
+    agents = get_agents()
+    try:
+        # Verify auth token
+        user_id = verify_auth_token(req)
+
+        data = req.get_json()
+        session_id = data.get('session_id')
+        response_text = data.get('response')
+
+        if not session_id or not response_text:
+            return https_fn.Response(
+                json.dumps({"error": "Missing session_id or response"}),
+                status=400,
+                content_type='application/json'
+            )
+
+        session_ref = get_db().collection('sessions').document(session_id)
+        with span('firestore_read'):
+            session_data = load_session(get_db(), session_ref)
+
+        if session_data is None:
+            return https_fn.Response(
+                json.dumps({"error": "Session not found"}),
+                status=404,
+                content_type='application/json'
+            )
+
+        # Verify user owns this session
+        if session_data['user_id'] != user_id:
+            return https_fn.Response(
+                json.dumps({"error": "Unauthorized access to session"}),
+                status=403,
+                content_type='application/json'
+            )
+
+    except ValueError as e:
+        return https_fn.Response(
+            json.dumps({"error": str(e)}),
+            status=401,
+            content_type='application/json'
+        )
+    except Exception as e:
+        return https_fn.Response(
+            json.dumps({"error": str(e)}),
+            status=500,
+            content_type='application/json'
+        )
+
+    current_question = session_data['current_question']
+    combined_evaluation = wants_combined_evaluation(data)
+    scoring_request = ScoringRequest(
+        question=current_question,
+        response=response_text,
+        role=session_data['role']
+    )
+
+    async def evaluate():
+        if combined_evaluation:
+            try:
+                evaluation = await agents.scorer.evaluate_response(scoring_request)
+                yield 'score', {'score': evaluation.score, 'breakdown': evaluation.breakdown.dict()}
+                yield 'feedback_token', {'token': evaluation.feedback}
+                return
+            except EvaluationError:
+                # Fall back to the separate score and streamed feedback calls
+                pass
+
+        score = await agents.scorer.score_response(scoring_request)
+        yield 'score', {'score': score}
+
+        feedback_request = FeedbackRequest(
+            question=current_question,
+            response=response_text,
+            score=score,
+            role=session_data['role']
+        )
+        async for token in agents.feedback.stream_feedback(feedback_request):
+            yield 'feedback_token', {'token': token}
+
+    async def ask_next():
+        pending = await get_question_speculator().take(session_id, session_ref, session_data)
+        if pending is not None:
+            yield 'question_token', {'token': pending}
+            return
+        question_request = await next_question_inputs(session_ref, session_data)
+        async for token in agents.interviewer.stream_question(question_request):
+            yield 'question_token', {'token': token}
+
+    async def events():
+        await ensure_agents_initialized()
+        async for event in merge_event_streams(evaluate(), ask_next()):
+            yield event
+
+    def stream():
+        # Runs after the handler returns; collect this response's calls from here
+        calls = track_calls()
+        score = None
+        breakdown = None
+        feedback_parts = []
+        question_parts = []
+        try:
+            for event, payload in runtime.iterate(events()):
+                if event == 'score':
+                    score = payload['score']
+                    breakdown = payload.get('breakdown')
+                elif event == 'feedback_token':
+                    feedback_parts.append(payload['token'])
+                else:
+                    question_parts.append(payload['token'])
+                yield format_sse(event, payload)
+
+            feedback = ''.join(feedback_parts).strip()
+            next_question = ''.join(question_parts).strip()
+            record_turn(session_ref, session_data, current_question, response_text, score, feedback, next_question,
+                        breakdown=breakdown)
+            save_usage(session_ref, user_id, calls)
+            get_question_speculator().launch(session_id, session_ref, session_data, user_id)
+            yield format_sse('done', {
+                'score': score,
+                'breakdown': breakdown,
+                'feedback': feedback,
+                'next_question': next_question
+            })
+        except Exception as e:
+            yield format_sse('error', {'error': str(e)})
+
+    return https_fn.Response(
+        stream(),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@https_fn.on_request(memory=1024,timeout_sec=540)
+@timed
 def get_session(req: https_fn.Request) -> https_fn.Response:
     """Get the current state of a session."""
     try:
@@ -292,8 +747,35 @@ def get_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        session_ref = db.collection('sessions').document(session_id)
-        session = session_ref.get()
+        # Optional projection and response_history paging
+        try:
+            fields = parse_fields(req.args.get('fields'))
+            cursor = int(req.args.get('cursor', 0))
+            page_size = int(req.args['page_size']) if 'page_size' in req.args else None
+        except ValueError as e:
+            return https_fn.Response(
+                json.dumps({"error": f"Invalid query parameters: {str(e)}"}),
+                status=400,
+                content_type='application/json'
+            )
+        if cursor < 0 or (page_size is not None and not 1 <= page_size <= MAX_HISTORY_PAGE_SIZE):
+            return https_fn.Response(
+                json.dumps({"error": f"cursor must be >= 0 and page_size between 1 and {MAX_HISTORY_PAGE_SIZE}"}),
+                status=400,
+                content_type='application/json'
+            )
+
+        # Only the requested header fields are transferred from Firestore
+        header_fields = None
+        if fields is not None:
+            header_fields = sorted(
+                (set(fields) - {'response_history', 'session_id'} - set(CONTEXT_FIELDS) - set(PRIVATE_FIELDS))
+                | set(PROJECTION_BASE_FIELDS)
+            )
+
+        session_ref = get_db().collection('sessions').document(session_id)
+        with span('firestore_read'):
+            session = session_ref.get(field_paths=header_fields)
 
         if not session.exists:
             return https_fn.Response(
@@ -312,9 +794,43 @@ def get_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
+        # Unchanged since the client's copy: skip the turn and context reads
+        etag = session_etag(session, fields, cursor, page_size)
+        cache_headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag_matches(req, etag):
+            return https_fn.Response(status=304, headers=cache_headers)
+
+        if fields is not None and schema_version(session_data) < SCHEMA_VERSION:
+            # Version 1 sessions keep their inputs and history on the header
+            with span('firestore_read'):
+                session_data = session_ref.get().to_dict()
+
+        if fields is None:
+            # The resume and job description stay in the context document
+            payload = header_view(session_data)
+        else:
+            payload = {field: session_data[field] for field in fields
+                       if field in session_data and field not in PRIVATE_FIELDS}
+            requested_context = [field for field in CONTEXT_FIELDS if field in fields]
+            if requested_context and schema_version(session_data) >= SCHEMA_VERSION:
+                with span('firestore_read'):
+                    context = context_ref(session_ref).get(field_paths=requested_context)
+                if context.exists:
+                    payload.update(context.to_dict())
+        payload['session_id'] = session_id
+
+        # Frontend expects the history under response_history
+        if fields is None or 'response_history' in fields:
+            with span('firestore_read'):
+                page, next_cursor = load_turns_page(session_ref, session_data, cursor, page_size)
+            payload['response_history'] = page
+            if page_size is not None:
+                payload['next_cursor'] = next_cursor
+
         return https_fn.Response(
-            json.dumps(session_data),
-            content_type='application/json'
+            json.dumps(payload, default=str),
+            content_type='application/json',
+            headers=cache_headers
         )
 
     except ValueError as e:
@@ -331,6 +847,7 @@ def get_session(req: https_fn.Request) -> https_fn.Response:
         )
 
 @https_fn.on_request(memory=1024,timeout_sec=540)
+@timed
 def end_session(req: https_fn.Request) -> https_fn.Response:
     """End an interview session and generate final analysis."""
     try:
@@ -347,8 +864,9 @@ def end_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        session_ref = db.collection('sessions').document(session_id)
-        session = session_ref.get()
+        session_ref = get_db().collection('sessions').document(session_id)
+        with span('firestore_read'):
+            session = session_ref.get()
 
         if not session.exists:
             return https_fn.Response(
@@ -367,27 +885,56 @@ def end_session(req: https_fn.Request) -> https_fn.Response:
                 content_type='application/json'
             )
 
-        # Generate final analysis
+        # The summary comes from the header's running aggregates. The stored
+        # transcript still carries every turn unless the caller opts out
+        include_turns = not data.get('summary_only')
+        backfill = {}
+        turns = None
+        if include_turns or not has_score_aggregates(session_data):
+            with span('firestore_read'):
+                turns = load_turns(session_ref, session_data)
+        if not has_score_aggregates(session_data):
+            # Scored before the aggregates existed: summarize once and store them
+            backfill = score_aggregates(turns)
+            session_data.update(backfill)
+
+        with span('firestore_read'):
+            context = context_ref(session_ref).get(field_paths=['usage'])
+        usage = (context.to_dict() or {}).get('usage', {}) if context.exists else {}
+
+        summary = score_summary(session_data)
         analysis = {
-            'questions': session_data['questions_asked'],
-            'responses': session_data['responses'],
-            'scores': session_data['scores'],
-            'feedback': session_data['feedback'],
-            'average_score': sum(session_data['scores']) / len(session_data['scores']) if session_data['scores'] else 0
+            'average_score': summary['average'],
+            'summary': summary,
+            'llm_usage': usage
         }
+        if include_turns:
+            # The header only keeps the latest questions; the turns have them all
+            questions = [turn['question'] for turn in turns]
+            if session_data.get('current_question'):
+                questions.append(session_data['current_question'])
+            analysis.update(
+                questions=questions,
+                responses=[turn['response'] for turn in turns],
+                scores=[turn['score'] for turn in turns],
+                feedback=[turn['feedback'] for turn in turns]
+            )
 
         # Store analysis in Firebase Storage
-        analysis_blob = bucket.blob(f'analysis/{session_id}.json')
-        analysis_blob.upload_from_string(
-            json.dumps(analysis),
-            content_type='application/json'
-        )
+        analysis_blob = get_bucket().blob(f'analysis/{session_id}.json')
+        with span('storage_upload'):
+            analysis_blob.upload_from_string(
+                json.dumps(analysis),
+                content_type='application/json'
+            )
 
         # Update session status
-        session_ref.update({
-            'status': 'completed',
-            'analysis_url': analysis_blob.public_url
-        })
+        with span('firestore_write'):
+            session_ref.update({
+                **backfill,
+                'status': 'completed',
+                'analysis_url': analysis_blob.public_url
+            })
 
         return https_fn.Response(
             json.dumps({
@@ -409,4 +956,18 @@ def end_session(req: https_fn.Request) -> https_fn.Response:
             json.dumps({"error": str(e)}),
             status=500,
             content_type='application/json'
-        )
\ No newline at end of file
+        )
+
+@https_fn.on_request()
+def metrics(req: https_fn.Request) -> https_fn.Response:
+    """LLM calls, tokens, latency and estimated cost per prompt, in the Prometheus text format."""
+    # Project-wide spend is not public: deny unless a token is configured and presented
+    if not METRICS_TOKEN:
+        return https_fn.Response('Not found\n', status=404, content_type='text/plain')
+    if not hmac.compare_digest(req.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+        return https_fn.Response('Unauthorized\n', status=401, content_type='text/plain')
+    try:
+        # Each function runs in its own instances, so the totals are read from Firestore
+        return https_fn.Response(usage_prometheus(get_db()), content_type='text/plain; version=0.0.4')
+    except Exception as e:
+        return https_fn.Response(f'Failed to read usage totals: {str(e)}\n', status=500, content_type='text/plain')
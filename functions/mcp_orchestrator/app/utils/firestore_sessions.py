@@ -0,0 +1,336 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from firebase_admin import firestore
+
+# Version 1 kept resume, job description and parallel per-turn arrays on the
+# session document itself. Version 2 keeps a slim header there, with the
+# interview inputs in a context document and each answer in a turn document.
+SCHEMA_VERSION = 2
+
+TURNS_COLLECTION = 'turns'
+CONTEXT_COLLECTION = 'context'
+CONTEXT_DOCUMENT = 'inputs'
+
+# Fields moved from the header to the context document
+CONTEXT_FIELDS = ('resume_text', 'job_description', 'context_digest')
+# Per-turn arrays duplicated on version 1 headers
+LEGACY_TURN_FIELDS = ('responses', 'scores', 'feedback', 'response_history')
+# Fields the API never returns: the speculated next question on the context
+# document (older headers may still carry it) and the header's context_key
+PRIVATE_FIELDS = ('pending_question', 'context_key')
+# Header fields every projected read needs, to authorize and page the request
+PROJECTION_BASE_FIELDS = ('user_id', 'schema_version', 'turn_count')
+# Most recent questions kept in the header's questions_asked, so its size does
+# not grow with the interview. The interviewer prompt only uses the last two;
+# the full history is on the turn documents.
+MAX_HEADER_QUESTIONS = 5
+
+class TurnConflictError(Exception):
+    """Raised when another submit already advanced the session past the expected turn."""
+
+def schema_version(session_data: Dict[str, Any]) -> int:
+    return session_data.get('schema_version', 1)
+
+def turn_count(session_data: Dict[str, Any]) -> int:
+    """Number of answered turns, including ones stored in the legacy arrays."""
+    if 'turn_count' in session_data:
+        return session_data['turn_count']
+    return len(session_data.get('responses', []))
+
+def turn_id(index: int) -> str:
+    # Zero-padded so document IDs sort in turn order
+    return f'{index:05d}'
+
+def score_updates(index: int, turn: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Header updates folding one scored turn into the session's running aggregates.
+
+    Besides the count, sum, minimum, maximum and last score, the header keeps
+    the sum of index-weighted scores, from which score_summary derives the
+    trend, and per-criterion sums of the score breakdowns.
+    """
+    score = turn['score']
+    updates = {
+        'score_count': firestore.Increment(1),
+        'score_total': firestore.Increment(score),
+        'score_index_total': firestore.Increment(index * score),
+        'score_min': firestore.Minimum(score),
+        'score_max': firestore.Maximum(score),
+        'score_last': score
+    }
+    breakdown = turn.get('breakdown')
+    if breakdown:
+        updates['breakdown_count'] = firestore.Increment(1)
+        for criterion, value in breakdown.items():
+            updates[f'breakdown_totals.{criterion}'] = firestore.Increment(value)
+    return updates
+
+def score_aggregates(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The running aggregates of ``turns``, in turn order, computed from scratch."""
+    aggregates = {'score_count': 0, 'score_total': 0.0, 'score_index_total': 0.0,
+                  'breakdown_count': 0, 'breakdown_totals': {}}
+    for index, turn in enumerate(turns):
+        score = turn.get('score', 0)
+        aggregates['score_count'] += 1
+        aggregates['score_total'] += score
+        aggregates['score_index_total'] += index * score
+        aggregates['score_min'] = min(aggregates.get('score_min', score), score)
+        aggregates['score_max'] = max(aggregates.get('score_max', score), score)
+        aggregates['score_last'] = score
+        if turn.get('breakdown'):
+            aggregates['breakdown_count'] += 1
+            for criterion, value in turn['breakdown'].items():
+                aggregates['breakdown_totals'][criterion] = aggregates['breakdown_totals'].get(criterion, 0.0) + value
+    return aggregates
+
+def has_score_aggregates(session_data: Dict[str, Any]) -> bool:
+    """Whether the header's aggregates cover every turn; sessions scored before they existed do not."""
+    return session_data.get('score_count') == turn_count(session_data)
+
+def score_summary(session_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Summarize a session's scores from its header aggregates alone.
+
+    ``trend`` is the least-squares slope of score against turn number, in
+    points per turn, or None before the second turn.
+    """
+    count = session_data.get('score_count', 0)
+    total = session_data.get('score_total', 0.0)
+    trend = None
+    if count >= 2:
+        # Turn numbers 0..count-1 have closed-form sums
+        index_sum = count * (count - 1) / 2
+        index_squares = (count - 1) * count * (2 * count - 1) / 6
+        trend = ((count * session_data.get('score_index_total', 0.0) - index_sum * total)
+                 / (count * index_squares - index_sum ** 2))
+    breakdown_count = session_data.get('breakdown_count', 0)
+    return {
+        'count': count,
+        'average': total / count if count else 0,
+        'min': session_data.get('score_min'),
+        'max': session_data.get('score_max'),
+        'last': session_data.get('score_last'),
+        'trend': trend,
+        'criteria': {
+            criterion: value / breakdown_count
+            for criterion, value in session_data.get('breakdown_totals', {}).items()
+        } if breakdown_count else {}
+    }
+
+def append_question(questions: List[str], question: str) -> List[str]:
+    """``questions`` plus ``question``, keeping only the last MAX_HEADER_QUESTIONS."""
+    return (list(questions) + [question])[-MAX_HEADER_QUESTIONS:]
+
+def context_ref(session_ref):
+    return session_ref.collection(CONTEXT_COLLECTION).document(CONTEXT_DOCUMENT)
+
+def context_key(context: Dict[str, Any]) -> str:
+    """
+    Hash of a session's interview inputs.
+
+    Kept on the header as ``context_key``, so the hot path can key work on the
+    inputs without reading the context document.
+    """
+    payload = json.dumps({key: context.get(key) for key in CONTEXT_FIELDS}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_context(session_ref, fields=CONTEXT_FIELDS) -> Dict[str, Any]:
+    """The given interview inputs from a session's context document."""
+    snapshot = context_ref(session_ref).get(field_paths=list(fields))
+    return (snapshot.to_dict() or {}) if snapshot.exists else {}
+
+def ensure_context(session_ref, session_data: Dict[str, Any], fields=CONTEXT_FIELDS) -> Dict[str, Any]:
+    """Add the given interview inputs to ``session_data``, reading only those not read yet."""
+    missing = [field for field in fields if field not in session_data]
+    if missing:
+        session_data.update(load_context(session_ref, missing))
+    return session_data
+
+def header_view(session_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The session as a version 2 header, whichever version it was read from."""
+    return {
+        key: value for key, value in session_data.items()
+        if key not in CONTEXT_FIELDS and key not in LEGACY_TURN_FIELDS and key not in PRIVATE_FIELDS
+    }
+
+def legacy_turns(session_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Turns recorded in a version 1 header's arrays."""
+    if 'response_history' in session_data:
+        return list(session_data['response_history'])
+    # Sessions older than response_history only have the parallel arrays
+    questions = session_data.get('questions_asked', [])
+    return [
+        {'question': question, 'response': response, 'score': score, 'feedback': feedback}
+        for question, response, score, feedback in zip(
+            questions,
+            session_data.get('responses', []),
+            session_data.get('scores', []),
+            session_data.get('feedback', [])
+        )
+    ]
+
+def create_session(db, session_ref, header: Dict[str, Any], context: Dict[str, Any]) -> None:
+    """Write a new version 2 session: the header and its context document, atomically."""
+    batch = db.batch()
+    batch.set(session_ref, {
+        **header,
+        'schema_version': SCHEMA_VERSION,
+        'turn_count': 0,
+        'score_count': 0,
+        'score_total': 0.0,
+        'score_index_total': 0.0,
+        'breakdown_count': 0,
+        'created_at': firestore.SERVER_TIMESTAMP,
+        'updated_at': firestore.SERVER_TIMESTAMP
+    })
+    batch.set(context_ref(session_ref), context)
+    batch.commit()
+
+def migrate_session(db, session_ref) -> Optional[Dict[str, Any]]:
+    """
+    Upgrade a version 1 session document to the header/context/turns layout.
+
+    Runs in a transaction, so a session is migrated exactly once even if two
+    requests race; the loser sees the upgraded header and does nothing.
+    Returns the merged session data, or None if the session does not exist.
+    """
+    turns_ref = session_ref.collection(TURNS_COLLECTION)
+    inputs_ref = context_ref(session_ref)
+
+    @firestore.transactional
+    def apply(transaction):
+        snapshot = session_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        if schema_version(data) >= SCHEMA_VERSION:
+            context = inputs_ref.get(transaction=transaction)
+            merged = {**data, **(context.to_dict() if context.exists else {})}
+            merged.setdefault('context_key', context_key(merged))
+            return merged
+
+        legacy = legacy_turns(data)
+        # Turns past the legacy arrays were already written as documents
+        recorded = [turn.to_dict() for turn in turns_ref.where('index', '>=', len(legacy)).get(transaction=transaction)]
+        recorded.sort(key=lambda turn: turn['index'])
+        aggregates = score_aggregates(legacy + recorded)
+
+        for index, turn in enumerate(legacy):
+            transaction.set(turns_ref.document(turn_id(index)), {**turn, 'index': index})
+        context = {key: data[key] for key in CONTEXT_FIELDS if key in data}
+        transaction.set(inputs_ref, context)
+
+        header = {
+            'schema_version': SCHEMA_VERSION,
+            'turn_count': len(legacy) + len(recorded),
+            **aggregates,
+            'context_key': context_key(context),
+            'updated_at': firestore.SERVER_TIMESTAMP
+        }
+        for key in CONTEXT_FIELDS + LEGACY_TURN_FIELDS:
+            if key in data:
+                header[key] = firestore.DELETE_FIELD
+        transaction.update(session_ref, header)
+
+        migrated = header_view(data)
+        migrated.update(schema_version=SCHEMA_VERSION, turn_count=header['turn_count'],
+                        context_key=header['context_key'], **aggregates)
+        return {**migrated, **context}
+
+    return apply(db.transaction())
+
+def load_session(db, session_ref) -> Optional[Dict[str, Any]]:
+    """
+    Read a session for the write paths: only its header.
+
+    The interview inputs stay on the context document until a caller needs
+    them (see ensure_context). Version 1 sessions are migrated on the way, and
+    headers written before context_key existed have their context read to
+    compute it. Returns None if the session does not exist.
+    """
+    header = session_ref.get()
+    if not header.exists:
+        return None
+    session_data = header.to_dict()
+    if schema_version(session_data) < SCHEMA_VERSION:
+        return migrate_session(db, session_ref)
+    if 'context_key' not in session_data:
+        ensure_context(session_ref, session_data)
+        session_data['context_key'] = context_key(session_data)
+    return session_data
+
+def commit_turn(db, session_ref, expected_turn: int, turn: Dict[str, Any], next_question: str,
+                context_hash: Optional[str] = None) -> None:
+    """
+    Persist one evaluated turn and advance the session, inside a transaction.
+
+    The turn is written as its own document in the session's ``turns``
+    subcollection and the session document only receives field-level updates,
+    so the write size stays constant however long the interview runs. The
+    running score aggregates are updated in the same commit (see
+    score_updates). The transaction re-reads the turn count and raises
+    TurnConflictError if a concurrent submit already recorded this turn,
+    instead of overwriting it. ``context_hash`` is stored as the header's
+    context_key if it has none yet.
+    """
+    turn_ref = session_ref.collection(TURNS_COLLECTION).document(turn_id(expected_turn))
+
+    @firestore.transactional
+    def apply(transaction):
+        snapshot = session_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise TurnConflictError('Session no longer exists')
+        data = snapshot.to_dict()
+        if turn_count(data) != expected_turn:
+            raise TurnConflictError('This question was already answered')
+
+        transaction.set(turn_ref, {**turn, 'index': expected_turn})
+        updates = {'context_key': context_hash} if context_hash and 'context_key' not in data else {}
+        transaction.update(session_ref, {
+            **updates,
+            'turn_count': expected_turn + 1,
+            **score_updates(expected_turn, turn),
+            'current_question': next_question,
+            # A bounded window rather than ArrayUnion, which would drop a
+            # repeated question and keep growing
+            'questions_asked': append_question(data.get('questions_asked', []), next_question),
+            # Only headers written before the speculation moved to the context document
+            'pending_question': firestore.DELETE_FIELD,
+            'updated_at': firestore.SERVER_TIMESTAMP
+        })
+        transaction.update(context_ref(session_ref), {'pending_question': firestore.DELETE_FIELD})
+
+    apply(db.transaction())
+
+def load_turns_page(session_ref, session_data: Dict[str, Any], start: int = 0,
+                    limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Return up to ``limit`` turns starting at turn ``start``, in turn order.
+
+    The second value is the cursor for the next page: the index of the first
+    turn not returned, or None once the history is exhausted. Only the turn
+    documents on the page are read.
+    """
+    total = turn_count(session_data)
+    stop = total if limit is None else min(start + limit, total)
+    if start >= stop:
+        return [], None
+
+    # Version 1 sessions that were never migrated keep their earlier answers
+    # in the header's arrays; turn documents follow them
+    legacy = legacy_turns(session_data) if schema_version(session_data) < SCHEMA_VERSION else []
+    page = legacy[start:stop]
+    first_document = max(start, len(legacy))
+    if stop > first_document:
+        query = (session_ref.collection(TURNS_COLLECTION)
+                 .where('index', '>=', first_document)
+                 .order_by('index')
+                 .limit(stop - first_document))
+        page += [turn.to_dict() for turn in query.stream()]
+    return page, (stop if stop < total else None)
+
+def load_turns(session_ref, session_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the full response history in turn order."""
+    return load_turns_page(session_ref, session_data)[0]
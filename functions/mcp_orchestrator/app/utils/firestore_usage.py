@@ -0,0 +1,64 @@
+import random
+from typing import Any, Dict
+
+from firebase_admin import firestore
+
+from .firestore_sessions import context_ref
+from .usage import merge_totals, prometheus_text
+
+# usage_rollups/{user_id} holds each user's totals across sessions
+USAGE_ROLLUPS_COLLECTION = 'usage_rollups'
+# usage_totals/{shard} hold the totals of every call. Each write lands on a
+# random shard, so concurrent requests rarely contend for one document
+USAGE_TOTALS_COLLECTION = 'usage_totals'
+USAGE_SHARDS = 10
+
+def usage_increments(totals: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, Any]]:
+    """Per-prompt totals as a nested map of increments."""
+    return {
+        prompt: {field: firestore.Increment(value) for field, value in fields.items()}
+        for prompt, fields in totals.items()
+    }
+
+def add_usage(writer, db, session_ref, user_id: str, totals: Dict[str, Dict[str, float]]) -> None:
+    """
+    Add a request's per-prompt LLM usage to its session, its user's rollup
+    and the global totals, as writes on ``writer`` (a batch or transaction).
+
+    The session keeps its usage on its context document, under
+    ``usage.<prompt>``, so background writes from speculative questions leave
+    the header and its ETag alone.
+    """
+    if not totals:
+        return
+    increments = usage_increments(totals)
+    writer.update(context_ref(session_ref), {
+        f'usage.{prompt}.{field}': increment
+        for prompt, fields in increments.items() for field, increment in fields.items()
+    })
+    writer.set(db.collection(USAGE_ROLLUPS_COLLECTION).document(user_id), {
+        'user_id': user_id,
+        'usage': increments,
+        'updated_at': firestore.SERVER_TIMESTAMP
+    }, merge=True)
+    shard = db.collection(USAGE_TOTALS_COLLECTION).document(str(random.randrange(USAGE_SHARDS)))
+    writer.set(shard, {'usage': increments}, merge=True)
+
+def record_usage(db, session_ref, user_id: str, totals: Dict[str, Dict[str, float]]) -> None:
+    """Write a request's LLM usage on its own, in one batch."""
+    if not totals:
+        return
+    batch = db.batch()
+    add_usage(batch, db, session_ref, user_id, totals)
+    batch.commit()
+
+def load_usage_totals(db) -> Dict[str, Dict[str, float]]:
+    """Per-prompt totals of every recorded call, summed over the shards."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for shard in db.collection(USAGE_TOTALS_COLLECTION).stream():
+        merge_totals(totals, (shard.to_dict() or {}).get('usage', {}))
+    return totals
+
+def usage_prometheus(db) -> str:
+    """The global totals in the Prometheus text format, labelled by prompt."""
+    return prometheus_text([({'prompt': prompt}, fields) for prompt, fields in sorted(load_usage_totals(db).items())])
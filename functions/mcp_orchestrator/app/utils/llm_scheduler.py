@@ -0,0 +1,208 @@
+import asyncio
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+import openai
+
+from .llm_limiter import LLMOverloadedError
+
+# Provider limits assumed until the first response reports the real ones
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "3500"))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "90000"))
+# Retries after a rate limit, timeout or server error, with jittered exponential backoff
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 20.0
+# Longest a call waits for rate budget before it is shed
+MAX_WAIT_SEC = float(os.getenv("LLM_MAX_WAIT_SEC", "30"))
+# Share of each bucket background work must leave for interactive turns
+BACKGROUND_RESERVE = 0.2
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Priority of the LLM calls made from the current task
+llm_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a rate-limit reset duration such as ``6m0s`` or ``20ms`` into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Server-suggested delay from ``retry-after-ms`` or ``retry-after``, in seconds."""
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+class TokenBucket:
+    """A per-minute budget that refills continuously and may run into debt."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, reserve: float = 0.0) -> float:
+        """Seconds until ``amount`` can be taken while leaving ``reserve`` of capacity untouched."""
+        self._refill()
+        needed = min(amount + reserve * self.capacity, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit: Optional[str], remaining: Optional[str]) -> None:
+        """Adopt the limit and remaining budget reported by the provider."""
+        try:
+            if limit:
+                self.capacity = float(limit)
+                self.rate = self.capacity / 60.0
+            if remaining:
+                # The provider's count already includes calls still in flight
+                self._refill()
+                self.tokens = min(self.capacity, float(remaining))
+        except ValueError:
+            pass
+
+class RateLimitScheduler:
+    """
+    Paces LLM calls to the provider's request and token limits.
+
+    Each call is admitted once both the requests-per-minute and the
+    tokens-per-minute bucket can cover it; its token cost is estimated up
+    front from the measured prompt plus ``max_tokens`` and corrected from the
+    reported usage afterwards. The buckets follow the provider's
+    ``x-ratelimit-*`` headers, so several processes sharing one key converge
+    on the real remaining budget. Background work (``llm_priority`` set to
+    BACKGROUND, e.g. speculative questions) must leave a reserve in both
+    buckets, so interactive turns are admitted first when budget is short.
+    Rate limits, timeouts and server errors are retried with full-jitter
+    exponential backoff; a call that cannot be admitted within ``max_wait``
+    seconds is shed with LLMOverloadedError instead of failing with a 500.
+    """
+
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 max_retries: int = MAX_RETRIES, max_wait: float = MAX_WAIT_SEC):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.admitted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.waited_sec = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    async def _admit(self, estimated_tokens: int, priority: str) -> None:
+        reserve = BACKGROUND_RESERVE if priority == BACKGROUND else 0.0
+        waited = 0.0
+        while True:
+            delay = max(self.requests.wait_time(1, reserve), self.tokens.wait_time(estimated_tokens, reserve))
+            if delay <= 0:
+                break
+            if waited + delay > self.max_wait:
+                self.shed += 1
+                raise LLMOverloadedError("LLM rate limit reached; try again shortly", retry_after=int(delay) + 1)
+            # Jitter spreads out callers that were all waiting for the same refill
+            delay = min(delay * random.uniform(1.0, 1.2), self.max_wait - waited)
+            await asyncio.sleep(delay)
+            waited += delay
+        self.requests.take(1)
+        self.tokens.take(estimated_tokens)
+        self.admitted[priority] = self.admitted.get(priority, 0) + 1
+        self.waited_sec += waited
+
+    def _observe(self, headers: Mapping[str, str]) -> None:
+        self.requests.sync(headers.get("x-ratelimit-limit-requests"), headers.get("x-ratelimit-remaining-requests"))
+        self.tokens.sync(headers.get("x-ratelimit-limit-tokens"), headers.get("x-ratelimit-remaining-tokens"))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        suggested = retry_after(response.headers) if response is not None else None
+        if suggested is not None:
+            return min(suggested, BACKOFF_MAX_SEC)
+        return random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt))
+
+    async def run(self, call: Callable[[], Awaitable[Any]], estimated_tokens: int,
+                  priority: Optional[str] = None) -> Any:
+        """
+        Make ``call`` under the rate limits and return its raw response.
+
+        ``call`` must return an openai ``with_raw_response`` result, whose
+        headers are used to keep the buckets in step with the provider.
+        """
+        priority = priority or llm_priority.get()
+        for attempt in range(self.max_retries + 1):
+            await self._admit(estimated_tokens, priority)
+            try:
+                raw = await call()
+            except RETRYABLE_ERRORS as e:
+                response = getattr(e, "response", None)
+                if response is not None:
+                    self._observe(response.headers)
+                if isinstance(e, openai.RateLimitError):
+                    self.rate_limited += 1
+                if attempt == self.max_retries:
+                    if isinstance(e, openai.RateLimitError):
+                        self.shed += 1
+                        raise LLMOverloadedError("LLM rate limit reached; try again shortly") from e
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            self._observe(raw.headers)
+            return raw
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once a call's real usage is known."""
+        if actual_tokens is not None:
+            self.tokens.give_back(estimated_tokens - actual_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'admitted': dict(self.admitted),
+            'waited_sec': round(self.waited_sec, 3),
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'shed': self.shed,
+            'requests_available': round(self.requests.tokens, 1),
+            'tokens_available': round(self.tokens.tokens, 1),
+        }
+
+# Shared by every LLM call in the process
+llm_scheduler = RateLimitScheduler()
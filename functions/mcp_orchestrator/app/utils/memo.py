@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .cache import LRUCache
+
+# Bump whenever the scoring or feedback prompts change, so results produced
+# under the old rubric are never served for the new one.
+RUBRIC_VERSION = "1"
+
+MEMO_MAX_ENTRIES = int(os.getenv("AGENT_MEMO_MAX_ENTRIES", "2048"))
+MEMO_TTL_SEC = float(os.getenv("AGENT_MEMO_TTL_SEC", "3600"))
+# Set AGENT_MEMO_PERSISTENT=1 to share results across instances through Firestore
+MEMO_PERSISTENT = os.getenv("AGENT_MEMO_PERSISTENT", "0") == "1"
+# Longest a lookup waits on the persistent tier before calling the model instead
+MEMO_READ_TIMEOUT_SEC = float(os.getenv("AGENT_MEMO_READ_TIMEOUT_SEC", "0.2"))
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different resubmits share a key."""
+    return " ".join(text.split()).casefold()
+
+def memo_key(kind: str, question: str, response: str, role: str, **extra: Any) -> str:
+    """Hash of the normalized inputs that determine an agent's output."""
+    payload = json.dumps({
+        'kind': kind,
+        'rubric_version': RUBRIC_VERSION,
+        'question': normalize_text(question),
+        'response': normalize_text(response),
+        'role': normalize_text(role),
+        **extra,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class FirestoreMemoStore:
+    """
+    Persistent memo tier backed by a Firestore collection, shared by all instances.
+
+    ``expires_at`` is a timestamp, so a Firestore TTL policy on it deletes
+    expired documents.
+    """
+
+    def __init__(self, collection, ttl: float = MEMO_TTL_SEC):
+        self._collection = collection
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        snapshot = self._collection.document(key).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        # TTL deletion can lag expiry by a day or more, so check it here too
+        expires_at = data.get('expires_at')
+        if not isinstance(expires_at, datetime) or expires_at < datetime.now(timezone.utc):
+            return None
+        return data['value']
+
+    def set(self, key: str, value: Any) -> None:
+        self._collection.document(key).set({
+            'value': value,
+            'expires_at': datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        })
+
+class AgentMemo:
+    """
+    Memoizes agent results for identical (question, response, role, rubric) inputs.
+
+    An in-process LRU with TTL is shared by every request on the instance, and
+    concurrent calls for the same key share one in-flight computation, so a
+    double-submit costs a single LLM call. An optional persistent tier extends
+    this across instances. Its reads give up after MEMO_READ_TIMEOUT_SEC and
+    its writes run in the background, so it never holds up a request for long.
+    """
+
+    def __init__(self, maxsize: int = MEMO_MAX_ENTRIES, ttl: float = MEMO_TTL_SEC, persistent=None):
+        self._memory = LRUCache(maxsize, ttl=ttl)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.persistent = persistent
+        self.persistent_hits = 0
+        self.persistent_errors = 0
+        self.computed = 0
+        self._writes: Set[asyncio.Future] = set()
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        """Return a memoized value from memory or the persistent tier, or None."""
+        value = self._memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = await asyncio.wait_for(asyncio.to_thread(self.persistent.get, key), MEMO_READ_TIMEOUT_SEC)
+        except Exception:
+            # The persistent tier is best effort; fall through to a fresh call
+            with self._lock:
+                self.persistent_errors += 1
+            return None
+        if value is not None:
+            self._memory.set(key, value)
+            with self._lock:
+                self.persistent_hits += 1
+        return value
+
+    async def store(self, key: str, value: Any) -> None:
+        self._memory.set(key, value)
+        if self.persistent is not None:
+            # Fire and forget: the caller already has its value
+            write = asyncio.get_running_loop().run_in_executor(None, self.persistent.set, key, value)
+            self._writes.add(write)
+            write.add_done_callback(self._write_done)
+
+    def _write_done(self, write: asyncio.Future) -> None:
+        self._writes.discard(write)
+        if not write.cancelled() and write.exception() is not None:
+            with self._lock:
+                self.persistent_errors += 1
+
+    async def wait(self, key: str) -> Optional[Any]:
+        """
+        Return the memoized value for ``key``, waiting for a computation already
+        in progress; None if there is neither.
+
+        If the caller computing the value is cancelled, its cancellation is not
+        passed on: this returns None once nobody is computing the value, so the
+        caller can compute it instead.
+        """
+        while True:
+            value = await self.lookup(key)
+            if value is not None:
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return None
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    # This caller was cancelled itself
+                    raise
+
+    def begin(self, key: str) -> asyncio.Future:
+        """
+        Mark ``key`` as being computed by the caller, so concurrent wait() calls
+        share its result. Call right after wait() returned None, with no await
+        in between, and end with finish() or abandon().
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    async def finish(self, key: str, future: asyncio.Future, value: Any) -> None:
+        """Memoize the value computed after begin() and hand it to the waiters."""
+        with self._lock:
+            self.computed += 1
+        future.set_result(value)
+        self._release(key, future)
+        await self.store(key, value)
+
+    def abandon(self, key: str, future: asyncio.Future, error: BaseException) -> None:
+        """End a computation started with begin() that raised ``error``."""
+        if isinstance(error, Exception):
+            future.set_exception(error)
+            # Waiters re-raise it; mark it retrieved so it is not reported as unhandled
+            future.exception()
+        else:
+            # Cancelled or closed: waiters compute the value themselves
+            future.cancel()
+        self._release(key, future)
+
+    def _release(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the memoized value for ``key``, computing it at most once at a time."""
+        value = await self.wait(key)
+        if value is not None:
+            return value
+
+        future = self.begin(key)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self.abandon(key, future, e)
+            raise
+        await self.finish(key, future, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._memory.stats(),
+            'persistent_hits': self.persistent_hits,
+            'persistent_errors': self.persistent_errors,
+            'computed': self.computed,
+        }
+
+# Shared by all agents in the process
+agent_memo = AgentMemo()
@@ -1,37 +1,22 @@
-import io
-import requests
-from PyPDF2 import PdfReader
 import re
+from .pdf_extractor import extractor
+from .resume_ingest import download_url
 
 def parse_pdf_from_url(url: str) -> str:
     """Download and parse a PDF file from a URL."""
     try:
-        # Download the PDF
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        
-        # Create a file-like object from the content
-        pdf_file = io.BytesIO(response.content)
+        # Download the PDF, capped in size and time
+        pdf_bytes = download_url(url, extractor.max_bytes)
         
         # Parse the PDF
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        
-        return text
+        return extractor.extract(pdf_bytes)
     except Exception as e:
         raise Exception(f"Failed to parse PDF from URL: {str(e)}")
 
 def parse_pdf_to_text(pdf_content: bytes) -> str:
     """Parse PDF content to text."""
     try:
-        pdf_file = io.BytesIO(pdf_content)
-        reader = PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
-        return text
+        return extractor.extract(pdf_content)
     except Exception as e:
         raise Exception(f"Failed to parse PDF: {str(e)}")
 
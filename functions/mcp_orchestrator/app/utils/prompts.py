@@ -0,0 +1,319 @@
+from string import Template
+from typing import Dict, List, Optional
+import os
+import threading
+
+# BPE files shipped with the deploy, so new instances don't download them
+# inside a request. Populated at build time by running this module.
+BUNDLED_ENCODINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiktoken_cache")
+if os.path.isdir(BUNDLED_ENCODINGS_DIR):
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", BUNDLED_ENCODINGS_DIR)
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character heuristic
+    tiktoken = None
+
+# Rough characters-per-token ratio for English text, used without tiktoken
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat format (role markers and separators)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+# Passes allowed to trim an over-budget prompt before giving up
+MAX_TRIM_ROUNDS = 8
+# Cap on the role field in every template that uses it
+ROLE_TOKENS = 30
+
+class TokenCounter:
+    """Counts and truncates text in model tokens."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_encoding(self):
+        # Loaded lazily: tiktoken reads its BPE ranks on first use
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if tiktoken is not None:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model)
+                    except Exception:
+                        try:
+                            self._encoding = tiktoken.get_encoding("cl100k_base")
+                        except Exception:
+                            self._encoding = None
+            return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        return len(encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text down to at most ``max_tokens`` tokens."""
+        encoding = self._get_encoding()
+        if encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Tokens a list of chat messages will use as model input."""
+        return sum(TOKENS_PER_MESSAGE + self.count(m["content"]) for m in messages) + TOKENS_PER_REPLY
+
+class TokenBudget:
+    """Input and output token limits for one agent call."""
+
+    def __init__(self, max_input_tokens: int, max_output_tokens: int):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+
+# Per-agent budgets. Output budgets match the max_tokens each call has always used.
+AGENT_BUDGETS: Dict[str, TokenBudget] = {
+    "interviewer": TokenBudget(max_input_tokens=900, max_output_tokens=100),
+    "digest": TokenBudget(max_input_tokens=4500, max_output_tokens=400),
+    "scorer": TokenBudget(max_input_tokens=1200, max_output_tokens=10),
+    "feedback": TokenBudget(max_input_tokens=1200, max_output_tokens=150),
+    "evaluator": TokenBudget(max_input_tokens=1300, max_output_tokens=250),
+}
+
+class BuiltPrompt:
+    """Rendered chat messages plus their measured size, ready to send."""
+
+    def __init__(self, name: str, messages: List[Dict[str, str]], prompt_tokens: int,
+                 max_tokens: int, temperature: float):
+        self.name = name
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+class PromptTemplate:
+    """
+    A chat prompt compiled once at import time.
+
+    ``field_limits`` caps individual fields in tokens. Fields listed there are
+    also the ones trimmed further if the rendered prompt still exceeds the
+    agent's input budget.
+    """
+
+    def __init__(self, name: str, agent: str, system: str, user: str,
+                 temperature: float, field_limits: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.agent = agent
+        self.system = system
+        self.user = Template(user)
+        self.temperature = temperature
+        self.field_limits = field_limits or {}
+        self.fields = set(self.user.get_identifiers())
+        unknown = set(self.field_limits) - self.fields
+        if unknown:
+            raise ValueError(f"Template '{name}' limits unknown fields: {', '.join(sorted(unknown))}")
+
+    def render(self, fields: Dict[str, str]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.substitute(fields)},
+        ]
+
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+def _register(template: PromptTemplate) -> None:
+    TEMPLATES[template.name] = template
+
+_register(PromptTemplate(
+    name="interviewer",
+    agent="interviewer",
+    system="You are an expert technical interviewer. Generate only the next interview question without any additional text or explanation.",
+    user="""Role: Expert Technical Interviewer for $role position
+
+Candidate and Role Digest:
+$digest
+
+Task: Generate a specific, technical interview question that:
+1. Tests both theoretical knowledge and practical skills
+2. Relates to the candidate's background
+3. Aligns with job requirements
+4. Is clear and concise
+
+Previous Questions Asked:
+$previous_questions""",
+    temperature=0.7,
+    field_limits={"role": ROLE_TOKENS, "digest": 500, "previous_questions": 200},
+))
+
+_register(PromptTemplate(
+    name="interviewer_raw",
+    agent="interviewer",
+    system="You are an expert technical interviewer. Generate only the next interview question without any additional text or explanation.",
+    user="""Role: Expert Technical Interviewer for $role position
+
+Job Description Summary:
+$job_description
+
+Key Resume Points:
+$resume_text
+
+Task: Generate a specific, technical interview question that:
+1. Tests both theoretical knowledge and practical skills
+2. Relates to the candidate's background
+3. Aligns with job requirements
+4. Is clear and concise
+
+Previous Questions Asked:
+$previous_questions""",
+    temperature=0.7,
+    field_limits={"role": ROLE_TOKENS, "job_description": 250, "resume_text": 250, "previous_questions": 200},
+))
+
+_register(PromptTemplate(
+    name="digest",
+    agent="digest",
+    system="You prepare concise interview briefs. Respond only with a JSON object.",
+    user="""Role: $role
+
+Job Description:
+$job_description
+
+Resume:
+$resume_text
+
+Summarize the candidate and the role as a JSON object with these keys:
+- "candidate_summary": one sentence describing the candidate
+- "skills": up to 10 technical skills the candidate has
+- "experience_highlights": up to 5 concrete achievements or projects
+- "role_requirements": up to 6 key requirements of the job
+- "focus_areas": up to 5 topics worth probing, where the resume and the job overlap or diverge
+
+Use short phrases.""",
+    temperature=0.2,
+    field_limits={"role": ROLE_TOKENS, "job_description": 1000, "resume_text": 3000},
+))
+
+_register(PromptTemplate(
+    name="scorer",
+    agent="scorer",
+    system="You are an expert technical evaluator. Provide only a numerical score between 0 and 1.",
+    user="""Question: $question
+
+Candidate Response: $response
+
+Evaluate the response for a $role position based on:
+1. Technical Accuracy (40%)
+2. Clarity (30%)
+3. Practical Understanding (30%)
+
+Return only a single number between 0 and 1 representing the total score.""",
+    temperature=0.3,
+    field_limits={"role": ROLE_TOKENS, "question": 200, "response": 800},
+))
+
+_register(PromptTemplate(
+    name="feedback",
+    agent="feedback",
+    system="You are an expert technical interviewer providing concise, actionable feedback.",
+    user="""Question: $question
+
+Response: $response
+
+Score: $score
+
+Provide brief, specific feedback that:
+1. Highlights one key strength
+2. Identifies one main area for improvement
+3. Gives one actionable suggestion
+4. Maintains a constructive tone
+
+Keep feedback under 100 words.""",
+    temperature=0.7,
+    field_limits={"question": 200, "response": 800},
+))
+
+_register(PromptTemplate(
+    name="evaluator",
+    agent="evaluator",
+    system="You are an expert technical interviewer who scores answers and gives concise, actionable feedback. Respond only with a JSON object.",
+    user="""Question: $question
+
+Candidate Response: $response
+
+Evaluate the response for a $role position. Score each criterion between 0 and 1:
+- "technical": Technical Accuracy (weight 40%)
+- "clarity": Clarity (weight 30%)
+- "practical": Practical Understanding (weight 30%)
+
+Then write feedback under 100 words that highlights one key strength, identifies one main area for improvement, gives one actionable suggestion and maintains a constructive tone.
+
+Return a JSON object of the form:
+{"technical": 0.0, "clarity": 0.0, "practical": 0.0, "feedback": "..."}""",
+    temperature=0.3,
+    field_limits={"role": ROLE_TOKENS, "question": 200, "response": 800},
+))
+
+class PromptBuilder:
+    """
+    Builds prompts from the compiled templates within each agent's token budget.
+
+    Every prompt is measured in tokens before it is sent, so callers can log
+    or reject it based on its exact size instead of a character count.
+    """
+
+    def __init__(self, model: str, budgets: Optional[Dict[str, TokenBudget]] = None):
+        self.counter = TokenCounter(model)
+        self.budgets = budgets or AGENT_BUDGETS
+
+    def build(self, name: str, **fields: str) -> BuiltPrompt:
+        template = TEMPLATES[name]
+        budget = self.budgets[template.agent]
+
+        fields = {
+            key: self.counter.truncate(str(value), template.field_limits[key])
+            if key in template.field_limits else str(value)
+            for key, value in fields.items()
+        }
+        messages = template.render(fields)
+        prompt_tokens = self.counter.count_messages(messages)
+
+        # Still over budget: shave the largest trimmable field and re-measure
+        for _ in range(MAX_TRIM_ROUNDS):
+            if prompt_tokens <= budget.max_input_tokens:
+                break
+            trimmable = {key: self.counter.count(fields[key]) for key in template.field_limits}
+            key = max(trimmable, key=trimmable.get) if trimmable else None
+            if key is None or trimmable[key] == 0:
+                break
+            overflow = prompt_tokens - budget.max_input_tokens
+            fields[key] = self.counter.truncate(fields[key], max(trimmable[key] - overflow, 0))
+            messages = template.render(fields)
+            prompt_tokens = self.counter.count_messages(messages)
+
+        if prompt_tokens > budget.max_input_tokens:
+            raise ValueError(
+                f"Prompt '{name}' needs {prompt_tokens} tokens; the budget is {budget.max_input_tokens}"
+            )
+
+        return BuiltPrompt(
+            name=name,
+            messages=messages,
+            prompt_tokens=prompt_tokens,
+            max_tokens=budget.max_output_tokens,
+            temperature=template.temperature
+        )
+
+# Encodings of the models the agents use
+BUNDLED_ENCODINGS = ("cl100k_base", "o200k_base")
+
+if __name__ == "__main__":
+    # Build step: download the encodings into BUNDLED_ENCODINGS_DIR
+    os.makedirs(BUNDLED_ENCODINGS_DIR, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = BUNDLED_ENCODINGS_DIR
+    for encoding in BUNDLED_ENCODINGS:
+        tiktoken.get_encoding(encoding)
+        print(f"Bundled {encoding} in {BUNDLED_ENCODINGS_DIR}")
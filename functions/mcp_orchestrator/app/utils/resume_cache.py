@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import LRUCache
+from .pdf_extractor import MAX_CHARS, MAX_PAGES
+
+# Firestore documents are capped at 1 MiB; leave room for the other fields
+MAX_PERSISTED_TEXT_CHARS = 900_000
+# Bump whenever resume parsing or cleaning changes, so text produced by the
+# old parser is never served. The extractor limits also shape the text.
+PARSER_VERSION = "1"
+PARSER_TAG = f"v{PARSER_VERSION}-p{MAX_PAGES}-c{MAX_CHARS}"
+# Resumes are personal data: cached text and URL mappings expire after this
+RESUME_CACHE_TTL_SEC = float(os.getenv("RESUME_CACHE_TTL_SEC", str(7 * 24 * 60 * 60)))
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class ResumeCache:
+    """
+    Content-addressed cache of cleaned resume text.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, so the same file is only
+    parsed once no matter how many sessions use it. Resume URLs are also mapped
+    to their content hash, which lets a repeat request for a known URL skip the
+    download as well. An in-process LRU sits in front of an optional persistent
+    tier (a Firestore collection), which is shared by all instances.
+
+    Text entries are also keyed by PARSER_TAG, so a parser change never serves
+    stale text. Every entry expires after ``ttl`` seconds. Persisted entries
+    carry an ``expires_at`` timestamp for a Firestore TTL policy to delete them.
+    """
+
+    def __init__(self, collection=None, url_collection=None, maxsize: int = 128,
+                 ttl: float = RESUME_CACHE_TTL_SEC):
+        self._collection = collection
+        self._url_collection = url_collection
+        self.ttl = ttl
+        self._texts = LRUCache(maxsize, ttl=ttl)
+        self._urls = LRUCache(maxsize * 8, ttl=ttl)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.download_bytes_saved = 0
+        self.parse_bytes_saved = 0
+
+    def load(self, url: str, download: Callable[[str], bytes], parse: Callable[[bytes], str]) -> str:
+        """
+        Return cleaned resume text for ``url``, downloading and parsing only on a miss.
+
+        Args:
+            url (str): Location of the resume PDF
+            download (Callable): Fetches the PDF bytes for a URL
+            parse (Callable): Turns PDF bytes into cleaned resume text
+
+        Returns:
+            str: Cleaned resume text
+        """
+        url_key = content_hash(url.encode('utf-8'))
+        known_hash = self._urls.get(url_key) or self._read_url_alias(url_key)
+        if known_hash:
+            entry = self._lookup(known_hash)
+            if entry is not None:
+                text, size_bytes = entry
+                self._record(download_saved=size_bytes, parse_saved=size_bytes)
+                return text
+
+        pdf_bytes = download(url)
+        pdf_hash = content_hash(pdf_bytes)
+        entry = self._lookup(pdf_hash)
+        if entry is not None:
+            text = entry[0]
+            self._record(parse_saved=len(pdf_bytes))
+        else:
+            with self._lock:
+                self.misses += 1
+            text = parse(pdf_bytes)
+            self._store(pdf_hash, text, len(pdf_bytes))
+
+        self._remember_url(url_key, pdf_hash)
+        return text
+
+    def _lookup(self, pdf_hash: str) -> Optional[Tuple[str, int]]:
+        text_key = f"{pdf_hash}-{PARSER_TAG}"
+        entry = self._texts.get(text_key)
+        if entry is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return entry
+
+        if self._collection is None:
+            return None
+        data = self._read_live(self._collection, text_key)
+        if data is None:
+            return None
+        entry = (data['text'], data.get('size_bytes', 0))
+        self._texts.set(text_key, entry)
+        with self._lock:
+            self.persistent_hits += 1
+        return entry
+
+    def _store(self, pdf_hash: str, text: str, size_bytes: int) -> None:
+        text_key = f"{pdf_hash}-{PARSER_TAG}"
+        self._texts.set(text_key, (text, size_bytes))
+        if self._collection is not None and len(text) <= MAX_PERSISTED_TEXT_CHARS:
+            self._collection.document(text_key).set({
+                'text': text,
+                'size_bytes': size_bytes,
+                'parser': PARSER_TAG,
+                'created_at': datetime.utcnow().isoformat(),
+                'expires_at': self._expires_at()
+            })
+
+    def _read_url_alias(self, url_key: str) -> Optional[str]:
+        if self._url_collection is None:
+            return None
+        data = self._read_live(self._url_collection, url_key)
+        if data is None:
+            return None
+        pdf_hash = data.get('content_hash')
+        if pdf_hash:
+            self._urls.set(url_key, pdf_hash)
+        return pdf_hash
+
+    def _remember_url(self, url_key: str, pdf_hash: str) -> None:
+        if self._urls.get(url_key) == pdf_hash:
+            return
+        self._urls.set(url_key, pdf_hash)
+        if self._url_collection is not None:
+            self._url_collection.document(url_key).set({
+                'content_hash': pdf_hash,
+                'expires_at': self._expires_at()
+            })
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _read_live(collection, key: str) -> Optional[Dict[str, Any]]:
+        """A document's data, or None if it is missing or expired."""
+        snapshot = collection.document(key).get()
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict()
+        # TTL deletion can lag expiry by a day or more, so check it here too.
+        # Entries written before expires_at existed count as expired.
+        expires_at = data.get('expires_at')
+        if not isinstance(expires_at, datetime) or expires_at < datetime.now(timezone.utc):
+            return None
+        return data
+
+    def _record(self, download_saved: int = 0, parse_saved: int = 0) -> None:
+        with self._lock:
+            self.download_bytes_saved += download_saved
+            self.parse_bytes_saved += parse_saved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            lookups = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                'download_bytes_saved': self.download_bytes_saved,
+                'parse_bytes_saved': self.parse_bytes_saved,
+            }
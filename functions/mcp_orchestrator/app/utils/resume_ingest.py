@@ -0,0 +1,123 @@
+import os
+import time
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+
+from .pdf_extractor import MAX_PDF_BYTES, PdfLimitError
+from .timing import span
+
+# Overall time allowed to fetch one resume, and to open the connection
+DOWNLOAD_TIMEOUT_SEC = float(os.getenv("RESUME_DOWNLOAD_TIMEOUT_SEC", "30"))
+CONNECT_TIMEOUT_SEC = 5.0
+# Bytes read per chunk; the byte cap and deadline are checked between chunks
+CHUNK_SIZE = 256 * 1024
+
+FIREBASE_STORAGE_HOST = "firebasestorage.googleapis.com"
+GCS_HOST = "storage.googleapis.com"
+
+class ResumeIngestError(ValueError):
+    """Raised when a resume cannot be fetched: missing, not the caller's, or too slow."""
+
+def storage_object_path(url: str, bucket_name: str) -> Optional[str]:
+    """
+    Return the object path in ``bucket_name`` that ``url`` refers to.
+
+    Understands Firebase download URLs (``/v0/b/<bucket>/o/<path>``, including
+    the Storage emulator's), ``gs://`` URLs and public GCS URLs. Returns None
+    for anything that is not an object in our bucket.
+    """
+    parsed = urlparse(url)
+    emulator_host = os.getenv("FIREBASE_STORAGE_EMULATOR_HOST")
+    if parsed.scheme == "gs":
+        bucket, path = parsed.netloc, parsed.path.lstrip("/")
+    elif parsed.netloc in (FIREBASE_STORAGE_HOST, emulator_host):
+        parts = parsed.path.split("/")
+        if len(parts) != 6 or parts[1:3] != ["v0", "b"] or parts[4] != "o":
+            return None
+        bucket, path = parts[3], unquote(parts[5])
+    elif parsed.netloc == GCS_HOST:
+        bucket, _, path = parsed.path.lstrip("/").partition("/")
+        path = unquote(path)
+    else:
+        return None
+    return path if bucket == bucket_name and path else None
+
+def _check_size(size: Optional[int], max_bytes: int) -> None:
+    if size is not None and size > max_bytes:
+        raise PdfLimitError(f"PDF is {size} bytes; the limit is {max_bytes}")
+
+def _append(buffer: bytearray, chunk: bytes, max_bytes: int, deadline: float) -> None:
+    buffer.extend(chunk)
+    _check_size(len(buffer), max_bytes)
+    if time.monotonic() > deadline:
+        raise ResumeIngestError("Timed out downloading the resume")
+
+def download_url(url: str, max_bytes: int = MAX_PDF_BYTES, timeout: float = DOWNLOAD_TIMEOUT_SEC,
+                 chunk_size: int = CHUNK_SIZE) -> bytes:
+    """Stream a URL into memory, stopping at ``max_bytes`` or after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    with requests.get(url, stream=True, timeout=(CONNECT_TIMEOUT_SEC, timeout)) as response:
+        response.raise_for_status()
+        declared = response.headers.get("Content-Length")
+        _check_size(int(declared) if declared and declared.isdigit() else None, max_bytes)
+
+        buffer = bytearray()
+        for chunk in response.iter_content(chunk_size):
+            _append(buffer, chunk, max_bytes, deadline)
+        return bytes(buffer)
+
+class ResumeIngest:
+    """
+    Fetches resume PDFs under a byte cap and a deadline.
+
+    The frontend uploads resumes to the project's own bucket, so their download
+    URLs are resolved back to the bucket object and read in chunks through the
+    Admin SDK instead of a public HTTPS round trip into our own storage. The
+    object's size is checked from its metadata before any content is read.
+    Other URLs fall back to a streamed HTTP download under the same limits.
+    """
+
+    def __init__(self, bucket, max_bytes: int = MAX_PDF_BYTES, timeout: float = DOWNLOAD_TIMEOUT_SEC,
+                 chunk_size: int = CHUNK_SIZE):
+        self.bucket = bucket
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+    def check_access(self, url: str, user_id: str) -> None:
+        """
+        Reject bucket objects outside the user's resume folder.
+
+        The Admin SDK bypasses Storage security rules, so ownership is enforced
+        here, before any cached copy of the resume can be served.
+        """
+        path = storage_object_path(url, self.bucket.name)
+        if path is not None and not path.startswith(f"resumes/{user_id}/"):
+            raise ResumeIngestError("Resume does not belong to the requesting user")
+
+    def fetch(self, url: str) -> bytes:
+        path = storage_object_path(url, self.bucket.name)
+        with span("resume_download"):
+            if path is None:
+                return download_url(url, self.max_bytes, self.timeout, self.chunk_size)
+            return self._fetch_object(path)
+
+    def _fetch_object(self, path: str) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        blob = self.bucket.get_blob(path, timeout=self.timeout)
+        if blob is None:
+            raise ResumeIngestError("Resume not found")
+        _check_size(blob.size, self.max_bytes)
+
+        buffer = bytearray()
+        # Pinned to the generation whose size was checked
+        with blob.open("rb", chunk_size=self.chunk_size, timeout=self.timeout,
+                       if_generation_match=blob.generation) as reader:
+            while True:
+                chunk = reader.read(self.chunk_size)
+                if not chunk:
+                    break
+                _append(buffer, chunk, self.max_bytes, deadline)
+        return bytes(buffer)
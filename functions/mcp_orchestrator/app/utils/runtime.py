@@ -0,0 +1,139 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from .openai_client import OpenAIClient
+
+T = TypeVar("T")
+
+# Connection pool sizing for the shared OpenAI client. Warm instances keep
+# these connections open between invocations, so only the first request on
+# a fresh instance pays for the TCP and TLS handshakes.
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY_SEC = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SEC", "300"))
+
+class ConnectionMetrics:
+    """Counts requests, new connections and TLS handshakes on the shared pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.handshake_ms = 0.0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        """httpx request hook that attaches an httpcore trace callback."""
+        with self._lock:
+            self.requests += 1
+        started: Dict[str, float] = {}
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                started[event_name] = time.perf_counter()
+            elif event_name == "connection.connect_tcp.complete":
+                with self._lock:
+                    self.new_connections += 1
+                    self.handshake_ms += (time.perf_counter() - started.pop("connection.connect_tcp.started")) * 1000
+            elif event_name == "connection.start_tls.complete":
+                with self._lock:
+                    self.tls_handshakes += 1
+                    self.handshake_ms += (time.perf_counter() - started.pop("connection.start_tls.started")) * 1000
+
+        request.extensions["trace"] = trace
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            pool_hits = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "pool_hits": pool_hits,
+                "pool_hit_ratio": round(pool_hits / self.requests, 3) if self.requests else 0.0,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "handshake_ms": round(self.handshake_ms, 1),
+            }
+
+class AgentRuntime:
+    """
+    Process-lifetime event loop and OpenAI client shared by all agents.
+
+    Cloud Functions handlers are synchronous, and calling ``asyncio.run`` per
+    request creates and tears down a loop each time, which also discards any
+    pooled connections bound to it. The runtime instead keeps one loop running
+    on a daemon thread and bridges synchronous callers onto it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._openai_client: Optional[OpenAIClient] = None
+        self.metrics = ConnectionMetrics()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background loop on first use and return it."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="agent-runtime",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Awaitable[T]) -> "Future[T]":
+        """Schedule a coroutine on the runtime loop without waiting for it."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the runtime loop and block until it finishes."""
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Consume an async iterator from synchronous code, one item at a time."""
+        iterator = agen.__aiter__()
+
+        async def next_item() -> T:
+            return await iterator.__anext__()
+
+        try:
+            while True:
+                try:
+                    item = self.run(next_item())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            # Release the producer if the consumer stops early (e.g. client disconnect)
+            if hasattr(iterator, "aclose"):
+                self.run(iterator.aclose())
+
+    def openai_client(self) -> OpenAIClient:
+        """Return the shared, connection-pooled OpenAI client."""
+        with self._lock:
+            if self._openai_client is None:
+                http_client = DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY_SEC
+                    ),
+                    event_hooks={"request": [self.metrics.on_request]}
+                )
+                self._openai_client = OpenAIClient(
+                    client=AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+                )
+            return self._openai_client
+
+runtime = AgentRuntime()
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .firestore_sessions import context_ref
+from .llm_scheduler import BACKGROUND, llm_priority
+from .runtime import runtime
+from .timing import request_timer, span
+from .usage import summarize, track_calls
+
+# In-flight and recently finished speculations kept per instance
+MAX_TRACKED_SESSIONS = 256
+# Speculation runs after the response has been sent. Cloud Functions only
+# allocates CPU while a request is in progress, so it would stall until the
+# next request; set SPECULATIVE_QUESTIONS=1 only where CPU is always allocated.
+SPECULATION_ENABLED = os.getenv("SPECULATIVE_QUESTIONS", "0") == "1"
+
+def question_inputs_key(session_data: Dict[str, Any]) -> str:
+    """
+    Hash everything the interviewer prompt depends on, from the session header alone.
+
+    A precomputed question is only valid for exactly these inputs; if the
+    role, interview inputs (via the header's context_key) or question history
+    change, the key changes and the speculative result is discarded.
+    """
+    payload = json.dumps({
+        'role': session_data['role'],
+        'context_key': session_data.get('context_key'),
+        'previous_questions': list(session_data.get('questions_asked', [])),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class QuestionSpeculator:
+    """
+    Precompute the next interview question as soon as the current one is issued.
+
+    The interviewer prompt depends only on previously asked questions, never on
+    the candidate's answers, so the following question can be generated while
+    the candidate is still typing. The result is stored on the session's
+    context document as ``pending_question`` together with the key of the
+    inputs it was built from, where the API never returns it and polling
+    clients' ETags are unaffected. It is also kept in memory so a later request on the same instance can
+    await a generation that is still in flight.
+
+    Disabled unless SPECULATIVE_QUESTIONS=1, since it needs CPU between requests.
+    """
+
+    def __init__(self, generate: Callable[[Any, Dict[str, Any]], Awaitable[str]],
+                 record_usage: Optional[Callable[[Any, str, Dict[str, Dict[str, float]]], None]] = None,
+                 enabled: bool = SPECULATION_ENABLED):
+        # Called as generate(session_ref, session_data), reading the interview inputs if it needs them
+        self._generate = generate
+        self.enabled = enabled
+        # Called as record_usage(session_ref, user_id, totals) with each speculation's LLM usage
+        self._record_usage = record_usage
+        self._lock = threading.Lock()
+        self._inflight: "OrderedDict[str, Tuple[str, Future]]" = OrderedDict()
+
+    def launch(self, session_id: str, session_ref, session_data: Dict[str, Any], user_id: Optional[str] = None) -> None:
+        """Start generating the question that follows the session's ``questions_asked``."""
+        if not self.enabled:
+            return
+        key = question_inputs_key(session_data)
+        # The request goes on updating its own copy
+        session_data = dict(session_data)
+
+        async def speculate() -> str:
+            # Yields rate budget to interactive turns; the task has its own context copy
+            llm_priority.set(BACKGROUND)
+            # Outlives the request that launched it, so its calls are not part of that request's timings
+            request_timer.set(None)
+            calls = track_calls()
+            question = await self._generate(session_ref, session_data)
+            await asyncio.to_thread(context_ref(session_ref).update, {
+                'pending_question': {'question': question, 'inputs_key': key}
+            })
+            if self._record_usage is not None and user_id is not None:
+                await asyncio.to_thread(self._record_usage, session_ref, user_id, summarize(calls))
+            return question
+
+        future = runtime.submit(speculate())
+        with self._lock:
+            self._inflight[session_id] = (key, future)
+            self._inflight.move_to_end(session_id)
+            while len(self._inflight) > MAX_TRACKED_SESSIONS:
+                self._inflight.popitem(last=False)
+
+    async def take(self, session_id: str, session_ref, session_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Return the precomputed question for the session's current inputs if one exists.
+
+        Returns None when nothing was precomputed for these exact inputs, in
+        which case the caller generates the question itself. The context
+        document is only read when this instance has no speculation to await.
+        """
+        if not self.enabled:
+            return None
+        key = question_inputs_key(session_data)
+        with self._lock:
+            key_and_future = self._inflight.pop(session_id, None)
+
+        if key_and_future is not None and key_and_future[0] == key:
+            try:
+                return await asyncio.wrap_future(key_and_future[1])
+            except Exception:
+                # A failed speculation is not an error for the caller
+                pass
+
+        # Launched on another instance, or before this one restarted
+        pending = session_data.get('pending_question')
+        if pending is None:
+            with span('firestore_read'):
+                snapshot = await asyncio.to_thread(context_ref(session_ref).get, field_paths=['pending_question'])
+            pending = (snapshot.to_dict() or {}).get('pending_question') if snapshot.exists else None
+        if pending and pending.get('inputs_key') == key:
+            return pending['question']
+        return None
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Tuple
+
+Event = Tuple[str, Any]
+
+class EventStreamCancelled(Exception):
+    """Raised to the consumer when a producer was cancelled before it finished."""
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def merge_event_streams(*producers: AsyncIterator[Event]) -> AsyncIterator[Event]:
+    """
+    Interleave several (event, data) streams, yielding each item as soon as it is produced.
+
+    If a producer fails or is cancelled, the remaining producers are cancelled
+    and the error is raised to the consumer.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def drain(producer: AsyncIterator[Event]) -> None:
+        error = None
+        try:
+            async for item in producer:
+                await queue.put(item)
+        except asyncio.CancelledError:
+            # Reported to the consumer as an ordinary error, so it neither
+            # waits on a producer that will not finish nor is itself cancelled
+            error = EventStreamCancelled("An event producer was cancelled")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            queue.put_nowait((done, error))
+
+    tasks = [asyncio.ensure_future(drain(producer)) for producer in producers]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item[0] is done:
+                if item[1] is not None:
+                    raise item[1]
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+StageFunc = Callable[..., Awaitable[Any]]
+
+class Stage:
+    """A named async step and the stages whose results it consumes."""
+
+    def __init__(self, name: str, func: StageFunc, deps: Sequence[str]):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+class StageExecutor:
+    """
+    Run a small graph of async stages, overlapping the independent ones.
+
+    Each stage receives the results of its dependencies as keyword arguments,
+    so a stage registered with ``deps=["score"]`` is called as ``func(score=...)``.
+    Dependencies must be registered before the stages that use them, which
+    keeps the graph acyclic without a separate validation pass.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Stage] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._total_ms = 0.0
+
+    def add(self, name: str, func: StageFunc, deps: Sequence[str] = ()) -> None:
+        """Register a stage. Raises ValueError for duplicates or unknown dependencies."""
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' is already registered")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {', '.join(missing)}")
+        self._stages[name] = Stage(name, func, deps)
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run all stages and return their results keyed by stage name.
+
+        If any stage fails, the stages still pending are cancelled and the
+        first error is raised.
+        """
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            kwargs = {dep: await tasks[dep] for dep in stage.deps}
+            stage_start = time.perf_counter()
+            try:
+                return await stage.func(**kwargs)
+            finally:
+                self._timings[stage.name] = {
+                    'start_ms': (stage_start - started) * 1000,
+                    'end_ms': (time.perf_counter() - started) * 1000,
+                }
+
+        for stage in self._stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            self._total_ms = (time.perf_counter() - started) * 1000
+
+        return dict(zip(tasks.keys(), results))
+
+    def critical_path(self) -> List[str]:
+        """Return the chain of stages that determined the total run time."""
+        if not self._timings:
+            return []
+        name = max(self._timings, key=lambda n: self._timings[n]['end_ms'])
+        path = [name]
+        while True:
+            deps = [dep for dep in self._stages[name].deps if dep in self._timings]
+            if not deps:
+                break
+            name = max(deps, key=lambda n: self._timings[n]['end_ms'])
+            path.append(name)
+        return list(reversed(path))
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the last run: per-stage timings, total time and critical path."""
+        return {
+            'total_ms': round(self._total_ms, 1),
+            'critical_path': self.critical_path(),
+            'stages': {
+                name: {
+                    'start_ms': round(timing['start_ms'], 1),
+                    'duration_ms': round(timing['end_ms'] - timing['start_ms'], 1),
+                }
+                for name, timing in self._timings.items()
+            },
+        }
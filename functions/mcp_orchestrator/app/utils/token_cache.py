@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Verified tokens kept per process; each entry lives until its token's exp
+MAX_TOKENS = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Stop trusting a cached token this long before it expires
+EXPIRY_LEEWAY_SEC = 5
+# How often the signing keys are re-fetched in the background
+CERT_REFRESH_SEC = float(os.getenv("AUTH_CERT_REFRESH_SEC", "600"))
+# Re-run the revocation hooks for a cached token at most this often
+REVOCATION_RECHECK_SEC = float(os.getenv("AUTH_REVOCATION_RECHECK_SEC", "300"))
+
+# A hook returns True if the decoded token must be rejected
+RevocationHook = Callable[[Dict[str, Any]], bool]
+
+class TokenRevokedError(ValueError):
+    """Raised when a token passed signature checks but was revoked."""
+
+def token_key(token: str) -> str:
+    """Cache key for a token; the raw token is never kept as a key."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def prefetch_firebase_certs(app=None) -> None:
+    """
+    Fetch the ID-token signing keys through firebase_admin's own key fetcher.
+
+    The fetcher honours the keys' Cache-Control, so warming it here keeps
+    both the first verification and every key rotation off the request path.
+    firebase_admin has no public hook for this, so it relies on the internals
+    of the version pinned in requirements.txt, and
+    mcp_orchestrator/tests/test_token_cache.py fails if an upgrade moves them.
+    """
+    from firebase_admin import _token_gen, auth
+
+    verifier = auth._get_client(app)._token_verifier
+    verifier.request(_token_gen.ID_TOKEN_CERT_URI)
+
+class VerifiedTokenCache:
+    """
+    Caches the claims of verified Firebase ID tokens.
+
+    Clients send the same ID token with every request until it is refreshed,
+    so after the first verification a token's claims are served from memory,
+    keyed by a hash of the token and dropped at the token's ``exp``. The
+    signing keys are prefetched and refreshed on a background thread.
+
+    Revocation: ``revoke_user`` rejects every token issued to a user before
+    the call, cached or not; ``revocation_hooks`` (e.g. a lookup of disabled
+    accounts) run on every verification and again for a cached token at
+    most every ``recheck_interval`` seconds.
+    """
+
+    def __init__(self, verify: Callable[[str], Dict[str, Any]], maxsize: int = MAX_TOKENS,
+                 prefetch: Optional[Callable[[], None]] = None, refresh_interval: float = CERT_REFRESH_SEC,
+                 recheck_interval: float = REVOCATION_RECHECK_SEC):
+        self._verify = verify
+        self._tokens = LRUCache(maxsize=maxsize)
+        self._prefetch = prefetch
+        self.refresh_interval = refresh_interval
+        self.recheck_interval = recheck_interval
+        self.revocation_hooks: List[RevocationHook] = []
+        self._lock = threading.Lock()
+        # uid -> time before which that user's tokens are rejected
+        self._revoked_before: Dict[str, float] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self.expired = 0
+        self.revoked = 0
+        self.cert_refreshes = 0
+        self.cert_refresh_errors = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's claims, verifying it only if it is not cached."""
+        self.start_refresh()
+        key = token_key(token)
+        now = time.time()
+        entry = self._tokens.get(key)
+        if entry is not None:
+            claims, checked_at = entry
+            if claims["exp"] - EXPIRY_LEEWAY_SEC <= now:
+                self._tokens.pop(key)
+                with self._lock:
+                    self.expired += 1
+            else:
+                self._check_revoked(key, claims)
+                if self.revocation_hooks and now - checked_at > self.recheck_interval:
+                    self._run_hooks(key, claims)
+                    self._tokens.set(key, (claims, now), ttl=claims["exp"] - EXPIRY_LEEWAY_SEC - now)
+                return claims
+
+        claims = self._verify(token)
+        self._check_revoked(key, claims)
+        self._run_hooks(key, claims)
+        ttl = claims["exp"] - EXPIRY_LEEWAY_SEC - now
+        if ttl > 0:
+            self._tokens.set(key, (claims, now), ttl=ttl)
+        return claims
+
+    def _check_revoked(self, key: str, claims: Dict[str, Any]) -> None:
+        revoked_before = self._revoked_before.get(claims["uid"])
+        if revoked_before is not None and claims.get("iat", 0) < revoked_before:
+            self._reject(key)
+
+    def _run_hooks(self, key: str, claims: Dict[str, Any]) -> None:
+        for hook in self.revocation_hooks:
+            if hook(claims):
+                self._reject(key)
+
+    def _reject(self, key: str) -> None:
+        self._tokens.pop(key)
+        with self._lock:
+            self.revoked += 1
+        raise TokenRevokedError("Authorization token has been revoked")
+
+    def revoke_user(self, uid: str, before: Optional[float] = None) -> None:
+        """Reject ``uid``'s tokens issued before ``before`` (default: now)."""
+        self._revoked_before[uid] = time.time() if before is None else before
+
+    def invalidate(self, token: str) -> None:
+        """Forget one token so its next use is verified again."""
+        self._tokens.pop(token_key(token))
+
+    def start_refresh(self) -> None:
+        """Prefetch the signing keys and keep them fresh on a daemon thread."""
+        if self._prefetch is None or self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="token-cert-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self._prefetch()
+                self.cert_refreshes += 1
+            except Exception:
+                # Verification still fetches the keys itself if this fails
+                self.cert_refresh_errors += 1
+                logger.warning("Failed to refresh token signing keys", exc_info=True)
+            time.sleep(self.refresh_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._tokens.stats(),
+            'expired': self.expired,
+            'revoked': self.revoked,
+            'revoked_users': len(self._revoked_before),
+            'cert_refreshes': self.cert_refreshes,
+            'cert_refresh_errors': self.cert_refresh_errors,
+        }
@@ -1,32 +1,69 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from pydantic import BaseModel
-from ..utils.openai_client import OpenAIClient
+from typing import Any, List, Dict, Optional, AsyncIterator
+from pydantic import BaseModel, Field, ValidationError
+from ..utils.openai_client import DEFAULT_SCORE, OpenAIClient, ScoreParseError
+from ..utils.memo import agent_memo, memo_key
 
 class QuestionRequest(BaseModel):
     role: str
     resume_text: str
     job_description: str
     previous_questions: List[Dict[str, str]] = []
+    context_digest: Optional[Dict[str, Any]] = None
+
+class DigestRequest(BaseModel):
+    role: str
+    resume_text: str
+    job_description: str
+
+class ContextDigest(BaseModel):
+    candidate_summary: str = ""
+    skills: List[str] = []
+    experience_highlights: List[str] = []
+    role_requirements: List[str] = []
+    focus_areas: List[str] = []
 
 class ScoringRequest(BaseModel):
     question: str
     response: str
     role: str
-    job_description: str
+    # Not used by the scoring prompts, so callers need not read it
+    job_description: Optional[str] = None
 
 class FeedbackRequest(BaseModel):
     question: str
     response: str
     score: float
     role: str
-    job_description: str
+    # Not used by the feedback prompts, so callers need not read it
+    job_description: Optional[str] = None
+
+# Criterion weights used by the scoring rubric
+CRITERIA_WEIGHTS = {"technical": 0.4, "clarity": 0.3, "practical": 0.3}
+
+# Attempts at getting a schema-valid evaluation before giving up
+EVALUATION_ATTEMPTS = 2
+
+class CriterionScores(BaseModel):
+    technical: float = Field(..., ge=0.0, le=1.0)
+    clarity: float = Field(..., ge=0.0, le=1.0)
+    practical: float = Field(..., ge=0.0, le=1.0)
+
+class Evaluation(BaseModel):
+    score: float
+    breakdown: CriterionScores
+    feedback: str
+
+class EvaluationError(ValueError):
+    """Raised when the model does not return a valid combined evaluation."""
 
 class BaseAgent(ABC):
     """Base class for all agents"""
     
-    def __init__(self):
+    def __init__(self, memo=agent_memo):
         self.openai_client = None
+        # Results shared across requests for identical inputs
+        self.memo = memo
     
     @abstractmethod
     async def initialize(self) -> None:
@@ -61,8 +98,52 @@ class InterviewerAgent(BaseAgent):
             role=request.role,
             resume_text=request.resume_text,
             job_description=request.job_description,
-            previous_qa=request.previous_questions
+            previous_qa=request.previous_questions,
+            context_digest=request.context_digest
         )
+    
+    async def digest_context(self, request: DigestRequest) -> Optional[Dict[str, Any]]:
+        """
+        Condense the resume and job description into a structured digest.
+        
+        Run once per session; later questions are generated from the digest
+        instead of re-sending truncated raw text on every turn.
+        
+        Args:
+            request (DigestRequest): Contains role, resume text, and job description
+            
+        Returns:
+            Optional[Dict[str, Any]]: The digest, or None if the model's output was unusable
+        """
+        try:
+            raw = await self.openai_client.generate_context_digest(
+                role=request.role,
+                resume_text=request.resume_text,
+                job_description=request.job_description
+            )
+            return ContextDigest(**raw).dict()
+        except (ValueError, TypeError):
+            # Questions fall back to the truncated resume and job description
+            return None
+    
+    async def stream_question(self, request: QuestionRequest) -> AsyncIterator[str]:
+        """
+        Stream the next interview question as it is generated.
+        
+        Args:
+            request (QuestionRequest): Contains role, resume text, and question history
+            
+        Yields:
+            str: Chunks of the next interview question
+        """
+        async for token in self.openai_client.stream_interview_question(
+            role=request.role,
+            resume_text=request.resume_text,
+            job_description=request.job_description,
+            previous_qa=request.previous_questions,
+            context_digest=request.context_digest
+        ):
+            yield token
 
 class ScorerAgent(BaseAgent):
     """Agent responsible for scoring responses"""
@@ -81,14 +162,58 @@ class ScorerAgent(BaseAgent):
             request (ScoringRequest): Contains question and response
             
         Returns:
-            float: Score between 0 and 1
+            float: Score between 0 and 1, or DEFAULT_SCORE if the model's reply
+            is not a number. That fallback is not memoized, so a retry asks
+            the model again.
         """
-        return await self.openai_client.score_response(
-            question=request.question,
-            response=request.response,
-            role=request.role,
-            job_description=request.job_description
-        )
+        key = memo_key('score', request.question, request.response, request.role)
+        try:
+            return await self.memo.get_or_compute(key, lambda: self.openai_client.score_response(
+                question=request.question,
+                response=request.response,
+                role=request.role,
+                job_description=request.job_description
+            ))
+        except ScoreParseError:
+            return DEFAULT_SCORE
+
+    async def evaluate_response(self, request: ScoringRequest) -> Evaluation:
+        """
+        Score the response per criterion and generate feedback in one call.
+        
+        Replaces the separate score and feedback round trips. The model's JSON
+        is validated against the rubric; instead of falling back to a default
+        score, an invalid reply is retried and then reported as an error.
+        
+        Args:
+            request (ScoringRequest): Contains question and response
+            
+        Returns:
+            Evaluation: Weighted score, per-criterion breakdown and feedback
+        """
+        key = memo_key('evaluation', request.question, request.response, request.role)
+        
+        async def evaluate() -> Dict[str, Any]:
+            error = None
+            for _ in range(EVALUATION_ATTEMPTS):
+                try:
+                    raw = await self.openai_client.evaluate_response(
+                        question=request.question,
+                        response=request.response,
+                        role=request.role
+                    )
+                    breakdown = CriterionScores(**raw)
+                    feedback = str(raw.get("feedback", "")).strip()
+                    if not feedback:
+                        raise ValueError("Evaluation is missing feedback")
+                except (ValueError, TypeError, ValidationError) as e:
+                    error = e
+                    continue
+                score = sum(getattr(breakdown, name) * weight for name, weight in CRITERIA_WEIGHTS.items())
+                return Evaluation(score=round(score, 4), breakdown=breakdown, feedback=feedback).dict()
+            raise EvaluationError(f"Invalid evaluation from model: {error}")
+        
+        return Evaluation(**await self.memo.get_or_compute(key, evaluate))
 
 class FeedbackAgent(BaseAgent):
     """Agent responsible for providing feedback"""
@@ -109,9 +234,47 @@ class FeedbackAgent(BaseAgent):
         Returns:
             str: Detailed feedback
         """
-        return await self.openai_client.generate_feedback(
+        return await self.memo.get_or_compute(self._memo_key(request), lambda: self.openai_client.generate_feedback(
             question=request.question,
             response=request.response,
             score=request.score,
             role=request.role
-        ) 
\ No newline at end of file
+        ))
+    
+    async def stream_feedback(self, request: FeedbackRequest) -> AsyncIterator[str]:
+        """
+        Stream feedback as it is generated.
+        
+        Args:
+            request (FeedbackRequest): Contains question, response, and score
+            
+        Yields:
+            str: Chunks of the feedback text
+        """
+        key = self._memo_key(request)
+        # Memoized, or being generated for a concurrent duplicate submit
+        cached = await self.memo.wait(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        future = self.memo.begin(key)
+        tokens = []
+        try:
+            async for token in self.openai_client.stream_feedback(
+                question=request.question,
+                response=request.response,
+                score=request.score,
+                role=request.role
+            ):
+                tokens.append(token)
+                yield token
+        except BaseException as e:
+            self.memo.abandon(key, future, e)
+            raise
+        await self.memo.finish(key, future, "".join(tokens).strip())
+    
+    @staticmethod
+    def _memo_key(request: FeedbackRequest) -> str:
+        return memo_key('feedback', request.question, request.response, request.role,
+                        score=round(request.score, 3))
@@ -1,14 +1,25 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
+from fastapi import Depends, FastAPI, HTTPException, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
+import hmac
+import os
 import uuid
 import asyncio
 from datetime import datetime
 
-from .utils.pdf_parser import parse_pdf_to_text, clean_resume_text
-from .utils.firebase_admin import require_auth
-from .agents.base import InterviewerAgent, ScorerAgent, FeedbackAgent, QuestionRequest, ScoringRequest, FeedbackRequest
+from .utils.pdf_parser import parse_pdf_from_url, parse_pdf_to_text, clean_resume_text
+from .utils.pdf_extractor import extractor
+from .utils.firebase_admin import require_auth, token_cache
+from .utils.sse import format_sse, merge_event_streams
+from .utils.session_store import SessionRecord, TurnRecord, create_session_store
+from .utils.session_backend import SessionConflictError
+from .utils.llm_limiter import LLMOverloadedError, llm_limiter
+from .utils.llm_scheduler import llm_scheduler
+from .utils.timing import TIMING_ENABLED, start_request
+from .utils.usage import merge_totals, summarize, track_calls, usage_meter
+from .agents.base import InterviewerAgent, ScorerAgent, FeedbackAgent, QuestionRequest, ScoringRequest, FeedbackRequest, DigestRequest, EvaluationError
 
 app = FastAPI(title="Mock Interview Coach MCP Orchestrator")
 
@@ -21,6 +32,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Default for requests that don't pass evaluation_mode: 'separate' or 'combined'
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "separate")
+
+# Longest role start-session accepts, in characters
+MAX_ROLE_LENGTH = 100
+
+# Bearer token /metrics and the stats endpoints require; without one they are disabled
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 # Initialize agents
 interviewer_agent = InterviewerAgent()
 scorer_agent = ScorerAgent()
@@ -32,6 +52,7 @@ class InterviewResponse(BaseModel):
     score: float
     feedback: str
     timestamp: str
+    breakdown: Optional[Dict[str, float]] = None
 
 class SessionState(BaseModel):
     session_id: str
@@ -41,14 +62,69 @@ class SessionState(BaseModel):
     job_description: str
     current_question: str
     response_history: List[InterviewResponse]
+    context_digest: Optional[Dict[str, Any]] = None
+    usage: Dict[str, Dict[str, float]] = {}
 
 class SubmitResponseRequest(BaseModel):
     session_id: str
     response: str
     user_id: str
+    evaluation_mode: Optional[str] = None
+    
+    @property
+    def combined_evaluation(self) -> bool:
+        return (self.evaluation_mode or EVALUATION_MODE) == "combined"
+
+# Session store, bounded by count, idle time and memory. With SESSION_BACKEND_URL
+# set it caches a backend shared by every worker, so uvicorn can run with --workers
+sessions = create_session_store()
+
+@app.exception_handler(SessionConflictError)
+async def session_conflict_handler(request: Request, exc: SessionConflictError) -> JSONResponse:
+    """Another worker updated the session first; the client should retry."""
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError) -> JSONResponse:
+    """Shed load instead of queueing LLM calls without bound."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
-# In-memory session store
-sessions: Dict[str, SessionState] = {}
+async def request_timing(request: Request, call_next):
+    """Report where each request's time went in a Server-Timing header and one structured log line."""
+    timer = start_request(request.url.path)
+    response = await call_next(request)
+    response.headers["Server-Timing"] = timer.server_timing()
+    timer.log(method=request.method, status=response.status_code)
+    return response
+
+# Every HTTP middleware adds a layer to each request, so skip it when timing is off
+if TIMING_ENABLED:
+    app.middleware("http")(request_timing)
+
+def require_metrics_token(request: Request) -> None:
+    """Deny operational endpoints unless METRICS_TOKEN is configured and presented."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+def session_state(record: SessionRecord) -> SessionState:
+    """Public view of a stored session."""
+    return SessionState(
+        session_id=record.session_id,
+        user_id=record.user_id,
+        role=record.role,
+        resume_text=record.resume_text,
+        job_description=record.job_description,
+        current_question=record.current_question,
+        response_history=[InterviewResponse(**turn.to_dict()) for turn in record.turns],
+        context_digest=record.context_digest,
+        usage=record.usage
+    )
 
 @app.post("/start-session")
 @require_auth
@@ -60,10 +136,13 @@ async def start_session(
     user_id: str = Form(...)
 ) -> Dict[str, str]:
     """Start a new interview session and return the first question."""
+    calls = track_calls()
     try:
         # Verify user_id matches the authenticated user
         if user_id != request.state.user_id:
             raise HTTPException(status_code=403, detail="User ID mismatch")
+        if len(role) > MAX_ROLE_LENGTH:
+            raise HTTPException(status_code=400, detail=f"role must be at most {MAX_ROLE_LENGTH} characters")
         
         # Get resume text from URL
         resume_text = await parse_pdf_from_url(resume_url)
@@ -71,31 +150,42 @@ async def start_session(
         
         session_id = str(uuid.uuid4())
         
+        # Condense the resume and job description once for every later turn
+        context_digest = await interviewer_agent.digest_context(DigestRequest(
+            role=role,
+            resume_text=resume_text,
+            job_description=job_description
+        ))
+        
         # Get the first question from the interviewer agent
         question_request = QuestionRequest(
             role=role,
             resume_text=resume_text,
             job_description=job_description,
-            previous_questions=[]
+            previous_questions=[],
+            context_digest=context_digest
         )
         
         first_question = await interviewer_agent.generate_question(question_request)
         
         # Create and store new session state
-        sessions[session_id] = SessionState(
+        await sessions.create_async(SessionRecord(
             session_id=session_id,
             user_id=user_id,
             role=role,
             resume_text=resume_text,
             job_description=job_description,
             current_question=first_question,
-            response_history=[]
-        )
+            context_digest=context_digest,
+            usage=summarize(calls)
+        ))
         
         return {
             "session_id": session_id,
             "question": first_question
         }
+    except (HTTPException, LLMOverloadedError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -103,31 +193,31 @@ async def start_session(
 @require_auth
 async def get_next_question(request: Request, session_id: str, user_id: str) -> Dict[str, str]:
     """Get the next interview question for a session."""
-    if session_id not in sessions:
+    calls = track_calls()
+    session = await sessions.get_async(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[session_id]
-    
     # Verify user owns this session
     if session.user_id != request.state.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this session")
     
     # Prepare previous questions
-    previous_questions = [
-        {"question": resp.question, "response": resp.response}
-        for resp in session.response_history
-    ]
+    previous_questions = session.previous_questions()
     
     # Get next question
     question_request = QuestionRequest(
         role=session.role,
         resume_text=session.resume_text,
         job_description=session.job_description,
-        previous_questions=previous_questions
+        previous_questions=previous_questions,
+        context_digest=session.context_digest
     )
     
     next_question = await interviewer_agent.generate_question(question_request)
     session.current_question = next_question
+    merge_totals(session.usage, summarize(calls))
+    await sessions.save_async(session)
     
     return {"question": next_question}
 
@@ -135,68 +225,217 @@ async def get_next_question(request: Request, session_id: str, user_id: str) ->
 @require_auth
 async def submit_response(request: Request, submit_request: SubmitResponseRequest) -> Dict[str, any]:
     """Submit a response and get the score and feedback."""
-    if submit_request.session_id not in sessions:
+    calls = track_calls()
+    session = await sessions.get_async(submit_request.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[submit_request.session_id]
-    
     # Verify user owns this session
     if session.user_id != request.state.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this session")
     
     current_question = session.current_question
     
-    # Get score from scorer agent
     scoring_request = ScoringRequest(
         question=current_question,
         response=submit_request.response,
         role=session.role,
         job_description=session.job_description
     )
-    score = await scorer_agent.score_response(scoring_request)
+    evaluation = None
+    if submit_request.combined_evaluation:
+        # One structured call for score, breakdown and feedback
+        try:
+            evaluation = await scorer_agent.evaluate_response(scoring_request)
+        except EvaluationError:
+            pass
     
-    # Get feedback from feedback agent
-    feedback_request = FeedbackRequest(
-        question=current_question,
-        response=submit_request.response,
-        score=score,
-        role=session.role,
-        job_description=session.job_description
-    )
-    feedback = await feedback_agent.generate_feedback(feedback_request)
+    if evaluation is not None:
+        score, feedback, breakdown = evaluation.score, evaluation.feedback, evaluation.breakdown.dict()
+    else:
+        # Get score from scorer agent
+        score = await scorer_agent.score_response(scoring_request)
+        
+        # Get feedback from feedback agent
+        feedback_request = FeedbackRequest(
+            question=current_question,
+            response=submit_request.response,
+            score=score,
+            role=session.role,
+            job_description=session.job_description
+        )
+        feedback = await feedback_agent.generate_feedback(feedback_request)
+        breakdown = None
     
-    # Create response record
-    response_record = InterviewResponse(
+    # Update session state
+    session.turns.append(TurnRecord(
         question=current_question,
         response=submit_request.response,
         score=score,
         feedback=feedback,
-        timestamp=datetime.utcnow().isoformat()
-    )
-    
-    # Update session state
-    session.response_history.append(response_record)
+        timestamp=datetime.utcnow().isoformat(),
+        breakdown=breakdown
+    ))
+    merge_totals(session.usage, summarize(calls))
+    await sessions.save_async(session)
     
     return {
         "score": score,
+        "breakdown": breakdown,
         "feedback": feedback,
-        "total_questions_answered": len(session.response_history)
+        "total_questions_answered": len(session.turns)
     }
 
+@app.post("/submit-response-stream")
+@require_auth
+async def submit_response_stream(request: Request, submit_request: SubmitResponseRequest) -> StreamingResponse:
+    """Submit a response and stream the score, feedback and next question as server-sent events."""
+    session = await sessions.get_async(submit_request.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Verify user owns this session
+    if session.user_id != request.state.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this session")
+    
+    current_question = session.current_question
+    
+    scoring_request = ScoringRequest(
+        question=current_question,
+        response=submit_request.response,
+        role=session.role,
+        job_description=session.job_description
+    )
+    
+    async def evaluate():
+        if submit_request.combined_evaluation:
+            try:
+                evaluation = await scorer_agent.evaluate_response(scoring_request)
+                yield "score", {"score": evaluation.score, "breakdown": evaluation.breakdown.dict()}
+                yield "feedback_token", {"token": evaluation.feedback}
+                return
+            except EvaluationError:
+                # Fall back to the separate score and streamed feedback calls
+                pass
+        
+        score = await scorer_agent.score_response(scoring_request)
+        yield "score", {"score": score}
+        
+        feedback_request = FeedbackRequest(
+            question=current_question,
+            response=submit_request.response,
+            score=score,
+            role=session.role,
+            job_description=session.job_description
+        )
+        async for token in feedback_agent.stream_feedback(feedback_request):
+            yield "feedback_token", {"token": token}
+    
+    async def ask_next():
+        # The answer being evaluated is part of the history for the next question
+        previous_questions = session.previous_questions() + [
+            {"question": current_question, "response": submit_request.response}
+        ]
+        question_request = QuestionRequest(
+            role=session.role,
+            resume_text=session.resume_text,
+            job_description=session.job_description,
+            previous_questions=previous_questions,
+            context_digest=session.context_digest
+        )
+        async for token in interviewer_agent.stream_question(question_request):
+            yield "question_token", {"token": token}
+    
+    async def stream():
+        # Runs after the handler returns; collect this response's calls from here
+        calls = track_calls()
+        score = None
+        breakdown = None
+        feedback_parts = []
+        question_parts = []
+        try:
+            async for event, payload in merge_event_streams(evaluate(), ask_next()):
+                if event == "score":
+                    score = payload["score"]
+                    breakdown = payload.get("breakdown")
+                elif event == "feedback_token":
+                    feedback_parts.append(payload["token"])
+                else:
+                    question_parts.append(payload["token"])
+                yield format_sse(event, payload)
+            
+            feedback = "".join(feedback_parts).strip()
+            next_question = "".join(question_parts).strip()
+            session.turns.append(TurnRecord(
+                question=current_question,
+                response=submit_request.response,
+                score=score,
+                feedback=feedback,
+                timestamp=datetime.utcnow().isoformat(),
+                breakdown=breakdown
+            ))
+            session.current_question = next_question
+            merge_totals(session.usage, summarize(calls))
+            await sessions.save_async(session)
+            yield format_sse("done", {
+                "score": score,
+                "breakdown": breakdown,
+                "feedback": feedback,
+                "next_question": next_question,
+                "total_questions_answered": len(session.turns)
+            })
+        except Exception as e:
+            yield format_sse("error", {"error": str(e)})
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/session/{session_id}")
 @require_auth
 async def get_session_state(request: Request, session_id: str, user_id: str) -> SessionState:
     """Get the current state of a session."""
-    if session_id not in sessions:
+    session = await sessions.get_async(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[session_id]
-    
     # Verify user owns this session
     if session.user_id != request.state.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to access this session")
     
-    return session
+    return session_state(session)
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def metrics() -> str:
+    """LLM calls, tokens, latency and estimated cost per prompt and model, in the Prometheus text format."""
+    return PlainTextResponse(usage_meter.prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm-usage/stats", dependencies=[Depends(require_metrics_token)])
+async def llm_usage_stats() -> Dict[str, Any]:
+    """This worker's LLM usage per prompt."""
+    return usage_meter.stats()
+
+@app.get("/llm-limiter/stats", dependencies=[Depends(require_metrics_token)])
+async def llm_limiter_stats() -> Dict[str, Any]:
+    """In-flight and queued LLM calls, and how many were shed."""
+    return llm_limiter.stats()
+
+@app.get("/llm-scheduler/stats", dependencies=[Depends(require_metrics_token)])
+async def llm_scheduler_stats() -> Dict[str, Any]:
+    """Calls admitted per priority, time spent waiting for rate budget, retries and remaining budget."""
+    return llm_scheduler.stats()
+
+@app.get("/auth/token-cache/stats", dependencies=[Depends(require_metrics_token)])
+async def token_cache_stats() -> Dict[str, Any]:
+    """Verified-token cache size, hit ratio, revocations and signing-key refreshes."""
+    return token_cache.stats()
+
+@app.get("/session-store/stats", dependencies=[Depends(require_metrics_token)])
+async def session_store_stats() -> Dict[str, Any]:
+    """Resident sessions, approximate bytes and eviction counts for this process."""
+    return sessions.stats()
 
 @app.on_event("startup")
 async def startup_event():
@@ -210,4 +449,5 @@ async def shutdown_event():
     """Cleanup agents when the application shuts down"""
     await interviewer_agent.cleanup()
     await scorer_agent.cleanup()
-    await feedback_agent.cleanup() 
\ No newline at end of file
+    await feedback_agent.cleanup()
+    extractor.shutdown() 
\ No newline at end of file
@@ -4,10 +4,16 @@ from fastapi import HTTPException, Request
 from functools import wraps
 import os
 
+from .timing import span
+from .token_cache import VerifiedTokenCache, prefetch_firebase_certs
+
 # Initialize Firebase Admin with service account
 cred = credentials.Certificate(os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH'))
 firebase_admin.initialize_app(cred)
 
+# Claims of verified ID tokens, reused until each token expires
+token_cache = VerifiedTokenCache(auth.verify_id_token, prefetch=prefetch_firebase_certs)
+
 async def verify_token(request: Request):
     """Verify Firebase authentication token from request headers."""
     auth_header = request.headers.get('Authorization')
@@ -16,7 +22,8 @@ async def verify_token(request: Request):
     
     token = auth_header.split(' ')[1]
     try:
-        decoded_token = auth.verify_id_token(token)
+        with span('auth'):
+            decoded_token = token_cache.verify(token)
         return decoded_token
     except Exception as e:
         raise HTTPException(status_code=401, detail=f'Invalid authentication token: {str(e)}')
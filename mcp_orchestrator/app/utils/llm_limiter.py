@@ -0,0 +1,83 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+# LLM calls allowed in flight per process, and calls allowed to wait for a slot
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+MAX_QUEUED = int(os.getenv("LLM_MAX_QUEUED", "64"))
+# Longest a queued call waits for a slot before it is shed
+QUEUE_TIMEOUT_SEC = float(os.getenv("LLM_QUEUE_TIMEOUT_SEC", "10"))
+# Suggested client back-off when a call is shed
+RETRY_AFTER_SEC = 2
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call is shed because every slot is busy and the wait queue is full."""
+
+    def __init__(self, message: str, retry_after: int = RETRY_AFTER_SEC):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ConcurrencyLimiter:
+    """
+    Caps concurrent LLM calls with a bounded wait queue.
+
+    Up to ``max_in_flight`` calls run at once. Further calls wait for a slot,
+    but at most ``max_queued`` of them and for at most ``queue_timeout``
+    seconds; beyond that they fail fast with LLMOverloadedError so the
+    handler can answer 429 instead of piling up work it cannot finish.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queued: int = MAX_QUEUED,
+                 queue_timeout: float = QUEUE_TIMEOUT_SEC):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one in-flight slot for the duration of the block."""
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending
+            await self._semaphore.acquire()
+        elif self.queued >= self.max_queued:
+            self.rejected += 1
+            raise LLMOverloadedError("Too many concurrent requests; try again shortly")
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise LLMOverloadedError("Timed out waiting for capacity; try again shortly")
+            finally:
+                self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'peak_in_flight': self.peak_in_flight,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'max_in_flight': self.max_in_flight,
+            'max_queued': self.max_queued,
+        }
+
+# Shared by every LLM call in the process
+llm_limiter = ConcurrencyLimiter()
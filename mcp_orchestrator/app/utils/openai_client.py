@@ -1,110 +1,172 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
+import json
 import openai
 import os
+import time
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from .prompts import PromptBuilder, BuiltPrompt
+from .llm_limiter import ConcurrencyLimiter, llm_limiter
+from .llm_scheduler import RateLimitScheduler, llm_scheduler
+from .timing import span
+from .usage import CallUsage, record_call
 
 # Load environment variables
 load_dotenv()
 
+# Score returned when the scorer's reply is not a number
+DEFAULT_SCORE = 0.5
+
+class ScoreParseError(ValueError):
+    """Raised when the scorer's reply is not a number."""
+
 class OpenAIClient:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(self, client: Optional[AsyncOpenAI] = None, limiter: Optional[ConcurrencyLimiter] = None,
+                 scheduler: Optional[RateLimitScheduler] = None):
+        # Retries are left to the scheduler, which knows the rate limits
+        self.client = client or AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
         self.model = "gpt-3.5-turbo"  # Using more cost-effective model
-    
-    async def generate_interview_question(self, role: str, resume_text: str, job_description: str, previous_qa: List[Dict[str, str]]) -> str:
-        """Generate a relevant interview question based on context."""
-        
-        # Create a more focused prompt for GPT-3.5
-        prompt = f"""Role: Expert Technical Interviewer for {role} position
-
-Job Description Summary:
-{job_description[:500]}  # Limiting context length for cost efficiency
-
-Key Resume Points:
-{resume_text[:500]}  # Limiting context length for cost efficiency
-
-Task: Generate a specific, technical interview question that:
-1. Tests both theoretical knowledge and practical skills
-2. Relates to the candidate's background
-3. Aligns with job requirements
-4. Is clear and concise
-
-Previous Questions Asked:
-{' '.join([qa['question'] for qa in previous_qa[-2:]])}  # Only including last 2 questions for context"""
-
-        conversation = [
-            {"role": "system", "content": "You are an expert technical interviewer. Generate only the next interview question without any additional text or explanation."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=conversation,
-            temperature=0.7,
-            max_tokens=100  # Reduced token limit for cost efficiency
+        self.prompts = PromptBuilder(self.model)
+        # Caps concurrent calls across every client in the process
+        self.limiter = limiter or llm_limiter
+        # Paces calls to the provider's request and token limits
+        self.scheduler = scheduler or llm_scheduler
+
+    def question_prompt(self, role: str, resume_text: str, job_description: str, previous_qa: List[Dict[str, str]],
+                        context_digest: Optional[Dict[str, Any]] = None) -> BuiltPrompt:
+        """Build the interviewer prompt, preferring the session's context digest over raw text."""
+        previous_questions = ' '.join([qa['question'] for qa in previous_qa[-2:]])
+        if context_digest:
+            return self.prompts.build(
+                "interviewer",
+                role=role,
+                digest=self._format_digest(context_digest),
+                previous_questions=previous_questions
+            )
+        return self.prompts.build(
+            "interviewer_raw",
+            role=role,
+            job_description=job_description,
+            resume_text=resume_text,
+            previous_questions=previous_questions
         )
-        
-        return response.choices[0].message.content.strip()
-    
-    async def score_response(self, question: str, response: str, role: str, job_description: str) -> float:
-        """Score the candidate's response."""
-        
-        prompt = f"""Question: {question}
-
-Candidate Response: {response}
-
-Evaluate the response for a {role} position based on:
-1. Technical Accuracy (40%)
-2. Clarity (30%)
-3. Practical Understanding (30%)
-
-Return only a single number between 0 and 1 representing the total score."""
-
-        conversation = [
-            {"role": "system", "content": "You are an expert technical evaluator. Provide only a numerical score between 0 and 1."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=conversation,
-            temperature=0.3,
-            max_tokens=10  # Very limited tokens since we only need a number
+
+    @staticmethod
+    def _format_digest(context_digest: Dict[str, Any]) -> str:
+        """Render a context digest as compact prompt lines."""
+        lines = [f"Candidate: {context_digest.get('candidate_summary', '')}"]
+        for label, key in (
+            ("Skills", "skills"),
+            ("Experience", "experience_highlights"),
+            ("Role requirements", "role_requirements"),
+            ("Focus areas", "focus_areas"),
+        ):
+            items = context_digest.get(key) or []
+            if items:
+                lines.append(f"{label}: {'; '.join(items)}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _estimated_tokens(prompt: BuiltPrompt) -> int:
+        return prompt.prompt_tokens + prompt.max_tokens
+
+    def _record_usage(self, prompt: BuiltPrompt, usage: Any, started: float) -> None:
+        if usage is not None:
+            record_call(CallUsage(prompt.name, self.model, usage.prompt_tokens, usage.completion_tokens,
+                                  usage.total_tokens, time.perf_counter() - started))
+
+    async def _complete(self, prompt: BuiltPrompt, **kwargs) -> str:
+        estimated = self._estimated_tokens(prompt)
+        with span(f"llm_{prompt.name}"):
+            async with self.limiter.slot():
+                started = time.perf_counter()
+                raw = await self.scheduler.run(lambda: self.client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=prompt.messages,
+                    temperature=prompt.temperature,
+                    max_tokens=prompt.max_tokens,
+                    **kwargs
+                ), estimated)
+            response = raw.parse()
+            self.scheduler.settle(estimated, response.usage.total_tokens if response.usage else None)
+            self._record_usage(prompt, response.usage, started)
+            return response.choices[0].message.content.strip()
+
+    async def _stream(self, prompt: BuiltPrompt) -> AsyncIterator[str]:
+        estimated = self._estimated_tokens(prompt)
+        # The slot is held until the stream is fully read; only opening the stream is retried
+        with span(f"llm_{prompt.name}"):
+            async with self.limiter.slot():
+                started = time.perf_counter()
+                raw = await self.scheduler.run(lambda: self.client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=prompt.messages,
+                    temperature=prompt.temperature,
+                    max_tokens=prompt.max_tokens,
+                    stream=True,
+                    # The last chunk then carries the call's token usage
+                    stream_options={"include_usage": True}
+                ), estimated)
+                usage = None
+                async for chunk in raw.parse():
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                self.scheduler.settle(estimated, usage.total_tokens if usage else None)
+                self._record_usage(prompt, usage, started)
+
+    async def generate_context_digest(self, role: str, resume_text: str, job_description: str) -> Dict[str, Any]:
+        """Condense the resume and job description into a structured digest, once per session."""
+        prompt = self.prompts.build(
+            "digest",
+            role=role,
+            job_description=job_description,
+            resume_text=resume_text
         )
-        
+        content = await self._complete(prompt, response_format={"type": "json_object"})
+        return json.loads(content)
+
+    async def generate_interview_question(self, role: str, resume_text: str, job_description: str, previous_qa: List[Dict[str, str]],
+                                          context_digest: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a relevant interview question based on context."""
+        prompt = self.question_prompt(role, resume_text, job_description, previous_qa, context_digest)
+        return await self._complete(prompt)
+
+    async def stream_interview_question(self, role: str, resume_text: str, job_description: str, previous_qa: List[Dict[str, str]],
+                                        context_digest: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Stream the next interview question token by token."""
+        prompt = self.question_prompt(role, resume_text, job_description, previous_qa, context_digest)
+        async for token in self._stream(prompt):
+            yield token
+
+    async def score_response(self, question: str, response: str, role: str,
+                             job_description: Optional[str] = None) -> float:
+        """Score the candidate's response; raises ScoreParseError if the reply is not a number."""
+        prompt = self.prompts.build("scorer", question=question, response=response, role=role)
+        content = await self._complete(prompt)
+
         try:
-            score = float(response.choices[0].message.content.strip())
-            return min(max(score, 0.0), 1.0)  # Ensure score is between 0 and 1
+            score = float(content)
         except ValueError:
-            return 0.5  # Default score if parsing fails
-    
+            raise ScoreParseError(f"Score is not a number: {content!r}") from None
+        return min(max(score, 0.0), 1.0)  # Ensure score is between 0 and 1
+
+    async def evaluate_response(self, question: str, response: str, role: str) -> Dict[str, Any]:
+        """Score the response per criterion and write feedback in a single JSON completion."""
+        prompt = self.prompts.build("evaluator", question=question, response=response, role=role)
+        content = await self._complete(prompt, response_format={"type": "json_object"})
+        return json.loads(content)
+
+    def feedback_prompt(self, question: str, response: str, score: float, role: str) -> BuiltPrompt:
+        """Build the feedback prompt."""
+        return self.prompts.build("feedback", question=question, response=response, score=f"{score:.2%}")
+
     async def generate_feedback(self, question: str, response: str, score: float, role: str) -> str:
         """Generate detailed feedback for the response."""
-        
-        prompt = f"""Question: {question}
-
-Response: {response}
-
-Score: {score:.2%}
-
-Provide brief, specific feedback that:
-1. Highlights one key strength
-2. Identifies one main area for improvement
-3. Gives one actionable suggestion
-4. Maintains a constructive tone
-
-Keep feedback under 100 words."""
-
-        conversation = [
-            {"role": "system", "content": "You are an expert technical interviewer providing concise, actionable feedback."},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=conversation,
-            temperature=0.7,
-            max_tokens=150  # Reduced for cost efficiency
-        )
-        
-        return response.choices[0].message.content.strip() 
\ No newline at end of file
+        return await self._complete(self.feedback_prompt(question, response, score, role))
+
+    async def stream_feedback(self, question: str, response: str, score: float, role: str) -> AsyncIterator[str]:
+        """Stream feedback for the response token by token."""
+        async for token in self._stream(self.feedback_prompt(question, response, score, role)):
+            yield token
@@ -0,0 +1,131 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from PyPDF2 import PdfReader, PdfWriter
+
+# Limits for resume extraction. Text beyond MAX_CHARS is never sent to the
+# model, so extraction stops as soon as that much has been collected.
+MAX_PDF_BYTES = int(os.getenv("PDF_MAX_BYTES", str(5 * 1024 * 1024)))
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "20000"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "2"))
+
+def _default_workers() -> int:
+    # Cloud Functions and Cloud Run set K_SERVICE. Their instances get about one
+    # vCPU, while os.cpu_count() reports the host's CPUs.
+    if os.getenv("K_SERVICE"):
+        return 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+WORKERS = int(os.getenv("PDF_WORKERS", str(_default_workers())))
+# Workers are started with forkserver (or spawn where it is unavailable), not
+# fork: forking copies the serving process's threads, locks and clients
+START_METHOD = os.getenv(
+    "PDF_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+class PdfLimitError(ValueError):
+    """Raised when a PDF exceeds the configured size limit."""
+
+def _extract_all_pages(pdf_bytes: bytes) -> List[str]:
+    """Extract the text of every page. Runs inside a worker process."""
+    return [page.extract_text() or "" for page in PdfReader(io.BytesIO(pdf_bytes)).pages]
+
+def _split_pages(reader: PdfReader, start: int, stop: int) -> bytes:
+    """Pages [start, stop) as a PDF of their own, with only the objects they use."""
+    writer = PdfWriter()
+    for i in range(start, stop):
+        writer.add_page(reader.pages[i])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+class PdfExtractor:
+    """
+    Bounded PDF text extraction.
+
+    Pages are extracted in batches on a process pool so CPU-heavy PDFs do not
+    hold the GIL of the serving process. Each batch is sent to its worker as
+    a PDF of just its pages, not the whole document. Batches are submitted in
+    waves and extraction stops once ``max_chars`` of text has been collected,
+    so long documents only pay for the pages that can actually reach the
+    prompt.
+    """
+
+    def __init__(self, max_bytes: int = MAX_PDF_BYTES, max_pages: int = MAX_PAGES,
+                 max_chars: int = MAX_CHARS, pages_per_task: int = PAGES_PER_TASK,
+                 workers: int = WORKERS):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.pages_per_task = max(pages_per_task, 1)
+        self.workers = max(workers, 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD)
+                )
+            return self._pool
+
+    def extract(self, pdf_bytes: bytes) -> str:
+        """
+        Extract text from a PDF within the configured limits.
+
+        Args:
+            pdf_bytes (bytes): The PDF file in bytes
+
+        Returns:
+            str: Page texts joined by newlines, truncated to ``max_chars``
+        """
+        if len(pdf_bytes) > self.max_bytes:
+            raise PdfLimitError(f"PDF is {len(pdf_bytes)} bytes; the limit is {self.max_bytes}")
+
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        page_count = min(len(reader.pages), self.max_pages)
+        batches = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+
+        pages: List[str] = []
+        collected = 0
+        if self.workers == 1 or len(batches) <= 1:
+            for start, stop in batches:
+                batch = [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+                pages.extend(batch)
+                collected += sum(len(text) for text in batch)
+                if collected >= self.max_chars:
+                    break
+        else:
+            pool = self._get_pool()
+            for wave_start in range(0, len(batches), self.workers):
+                wave = batches[wave_start:wave_start + self.workers]
+                futures = [pool.submit(_extract_all_pages, _split_pages(reader, start, stop)) for start, stop in wave]
+                for future in futures:
+                    batch = future.result()
+                    pages.extend(batch)
+                    collected += sum(len(text) for text in batch)
+                if collected >= self.max_chars:
+                    break
+
+        return "\n".join(pages)[:self.max_chars]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+extractor = PdfExtractor()
@@ -1,8 +1,37 @@
-from PyPDF2 import PdfReader
-from typing import Optional
-import io
-import requests
-import re
+import asyncio
+import httpx
+from .pdf_extractor import extractor
+from .timing import span
+
+# Download limits for resumes fetched by URL
+DOWNLOAD_TIMEOUT_SEC = 30.0
+
+async def parse_pdf_from_url(url: str) -> str:
+    """
+    Download a PDF and extract its text content.
+    
+    Args:
+        url (str): Location of the PDF
+        
+    Returns:
+        str: Extracted text from the PDF
+    """
+    try:
+        chunks = []
+        received = 0
+        with span("resume_download"):
+            async with httpx.AsyncClient(timeout=DOWNLOAD_TIMEOUT_SEC) as client:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        received += len(chunk)
+                        if received > extractor.max_bytes:
+                            raise ValueError(f"PDF exceeds {extractor.max_bytes} bytes")
+                        chunks.append(chunk)
+    except httpx.HTTPError as e:
+        raise ValueError(f"Error downloading PDF: {str(e)}")
+    
+    return await parse_pdf_to_text(b"".join(chunks))
 
 async def parse_pdf_to_text(file: bytes) -> str:
     """
@@ -15,14 +44,9 @@ async def parse_pdf_to_text(file: bytes) -> str:
         str: Extracted text from the PDF
     """
     try:
-        # Create a PDF reader object
-        pdf_reader = PdfReader(io.BytesIO(file))
-        
-        # Extract text from all pages
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-            
+        # Extraction is CPU-bound; keep it off the event loop
+        with span("pdf_parse"):
+            text = await asyncio.get_running_loop().run_in_executor(None, extractor.extract, file)
         return text.strip()
     except Exception as e:
         raise ValueError(f"Error parsing PDF: {str(e)}")
@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Shared backend selected by the environment; unset keeps sessions in-process
+SESSION_BACKEND_URL = os.getenv("SESSION_BACKEND_URL")
+
+# How long a worker waits for another worker's write lock before failing
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+class SessionConflictError(Exception):
+    """Raised when a session changed in the shared backend since it was read."""
+
+class SessionBackend(ABC):
+    """
+    Shared storage for session state, used by every orchestrator worker.
+
+    Every stored session carries a version that increases on each update.
+    Updates are conditional on the version the caller read, so two workers
+    cannot silently overwrite each other's turns.
+    """
+
+    @abstractmethod
+    def version(self, session_id: str, min_updated_at: float) -> Optional[int]:
+        """Current version of a session updated since ``min_updated_at``, or None."""
+
+    @abstractmethod
+    def load(self, session_id: str, min_updated_at: float) -> Optional[Tuple[Dict[str, Any], int]]:
+        """The session's data and version, or None."""
+
+    @abstractmethod
+    def insert(self, session_id: str, user_id: str, data: Dict[str, Any]) -> int:
+        """Store a new session and return its version."""
+
+    @abstractmethod
+    def update(self, session_id: str, data: Dict[str, Any], expected_version: int) -> int:
+        """Replace a session's data if it is still at ``expected_version``; return the new version."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def purge(self, updated_before: float) -> int:
+        """Delete sessions idle since before ``updated_before``; return how many."""
+
+class SqliteSessionBackend(SessionBackend):
+    """
+    Session backend on a SQLite database in WAL mode.
+
+    WAL lets readers in every worker proceed while one writer commits, which
+    is enough for multiple uvicorn workers on one host sharing a local file.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            self._local.connection = connection
+        return connection
+
+    def version(self, session_id: str, min_updated_at: float) -> Optional[int]:
+        row = self._connect().execute(
+            "SELECT version FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, min_updated_at)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id: str, min_updated_at: float) -> Optional[Tuple[Dict[str, Any], int]]:
+        row = self._connect().execute(
+            "SELECT data, version FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, min_updated_at)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def insert(self, session_id: str, user_id: str, data: Dict[str, Any]) -> int:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, user_id, version, updated_at, data) VALUES (?, ?, 1, ?, ?)",
+            (session_id, user_id, time.time(), json.dumps(data))
+        )
+        return 1
+
+    def update(self, session_id: str, data: Dict[str, Any], expected_version: int) -> int:
+        cursor = self._connect().execute(
+            "UPDATE sessions SET data = ?, version = version + 1, updated_at = ? WHERE session_id = ? AND version = ?",
+            (json.dumps(data), time.time(), session_id, expected_version)
+        )
+        if cursor.rowcount != 1:
+            raise SessionConflictError("Session was modified by another request; reload and retry")
+        return expected_version + 1
+
+    def delete(self, session_id: str) -> None:
+        self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge(self, updated_before: float) -> int:
+        return self._connect().execute("DELETE FROM sessions WHERE updated_at < ?", (updated_before,)).rowcount
+
+def backend_from_url(url: Optional[str]) -> Optional[SessionBackend]:
+    """
+    Build a backend from a ``SESSION_BACKEND_URL`` such as ``sqlite:////var/lib/mcp/sessions.db``.
+
+    Returns None, meaning process-local sessions only, when no URL is given.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:////abs/path.db is absolute, sqlite:///path.db is relative
+        path = parsed.path[1:] if parsed.path.startswith("//") else parsed.path.lstrip("/")
+        if not path:
+            raise ValueError("A sqlite session backend needs a database file path")
+        return SqliteSessionBackend(path)
+    raise ValueError(f"Unsupported session backend: {parsed.scheme}")
@@ -0,0 +1,360 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .session_backend import SESSION_BACKEND_URL, SessionBackend, SessionConflictError, backend_from_url
+from .timing import span
+
+# Defaults for the orchestrator's session store
+MAX_SESSIONS = int(os.getenv("SESSION_STORE_MAX_SESSIONS", "1000"))
+SESSION_TTL_SEC = float(os.getenv("SESSION_STORE_TTL_SEC", str(2 * 60 * 60)))
+MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Criterion order for breakdowns stored as tuples
+CRITERIA = ("technical", "clarity", "practical")
+
+class TurnRecord:
+    """One answered question. Breakdowns are kept as a tuple in CRITERIA order."""
+
+    __slots__ = ("question", "response", "score", "feedback", "timestamp", "breakdown")
+
+    def __init__(self, question: str, response: str, score: float, feedback: str, timestamp: str,
+                 breakdown: Optional[Dict[str, float]] = None):
+        self.question = question
+        self.response = response
+        self.score = score
+        self.feedback = feedback
+        self.timestamp = timestamp
+        self.breakdown = tuple(breakdown[name] for name in CRITERIA) if breakdown else None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TurnRecord":
+        return cls(data["question"], data["response"], data["score"], data["feedback"], data["timestamp"],
+                   data.get("breakdown"))
+
+    def breakdown_dict(self) -> Optional[Dict[str, float]]:
+        return dict(zip(CRITERIA, self.breakdown)) if self.breakdown else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "response": self.response,
+            "score": self.score,
+            "feedback": self.feedback,
+            "timestamp": self.timestamp,
+            "breakdown": self.breakdown_dict(),
+        }
+
+    def nbytes(self) -> int:
+        return (sys.getsizeof(self) + sys.getsizeof(self.question) + sys.getsizeof(self.response)
+                + sys.getsizeof(self.feedback) + sys.getsizeof(self.timestamp)
+                + (sys.getsizeof(self.breakdown) if self.breakdown else 0))
+
+class SessionRecord:
+    """
+    Compact in-memory state of one interview session.
+
+    ``role`` and ``job_description`` are interned by the store, so sessions
+    practising for the same posting share one copy of its text.
+    """
+
+    __slots__ = ("session_id", "user_id", "role", "resume_text", "job_description",
+                 "current_question", "turns", "context_digest", "usage", "version")
+
+    def __init__(self, session_id: str, user_id: str, role: str, resume_text: str, job_description: str,
+                 current_question: str, turns: Optional[List[TurnRecord]] = None,
+                 context_digest: Optional[Dict[str, Any]] = None,
+                 usage: Optional[Dict[str, Dict[str, float]]] = None, version: int = 0):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.role = role
+        self.resume_text = resume_text
+        self.job_description = job_description
+        self.current_question = current_question
+        self.turns = turns if turns is not None else []
+        self.context_digest = context_digest
+        # LLM usage per prompt, with the fields in usage.USAGE_FIELDS
+        self.usage = usage if usage is not None else {}
+        # Version this copy was read at from the shared backend
+        self.version = version
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "role": self.role,
+            "resume_text": self.resume_text,
+            "job_description": self.job_description,
+            "current_question": self.current_question,
+            "turns": [turn.to_dict() for turn in self.turns],
+            "context_digest": self.context_digest,
+            "usage": self.usage,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], version: int = 0) -> "SessionRecord":
+        return cls(
+            session_id=data["session_id"],
+            user_id=data["user_id"],
+            role=data["role"],
+            resume_text=data["resume_text"],
+            job_description=data["job_description"],
+            current_question=data["current_question"],
+            turns=[TurnRecord.from_dict(turn) for turn in data["turns"]],
+            context_digest=data.get("context_digest"),
+            usage=data.get("usage"),
+            version=version
+        )
+
+    def previous_questions(self) -> List[Dict[str, str]]:
+        return [{"question": turn.question, "response": turn.response} for turn in self.turns]
+
+    def nbytes(self) -> int:
+        """Approximate size, excluding the shared role and job description text."""
+        size = (sys.getsizeof(self) + sys.getsizeof(self.session_id) + sys.getsizeof(self.user_id)
+                + sys.getsizeof(self.resume_text) + sys.getsizeof(self.current_question)
+                + sys.getsizeof(self.turns) + sum(turn.nbytes() for turn in self.turns))
+        if self.context_digest:
+            size += sum(sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+                        if isinstance(value, list) else sys.getsizeof(value)
+                        for value in self.context_digest.values())
+        return size
+
+class _InternPool:
+    """Reference-counted string pool; a string is dropped with its last session."""
+
+    def __init__(self):
+        self._entries: Dict[str, List[Any]] = {}
+        self.nbytes = 0
+
+    def acquire(self, text: str) -> str:
+        entry = self._entries.get(text)
+        if entry is None:
+            entry = self._entries[text] = [text, 0]
+            self.nbytes += sys.getsizeof(text)
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, text: str) -> None:
+        entry = self._entries.get(text)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._entries[text]
+            self.nbytes -= sys.getsizeof(text)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SessionStore:
+    """
+    Bounded, evicting store for interview sessions.
+
+    Sessions are kept in least-recently-used order and evicted when idle for
+    longer than ``ttl`` seconds, when there are more than ``max_sessions`` of
+    them, or when their approximate total size exceeds ``max_bytes``. The
+    session being written is never evicted by its own write.
+
+    With a shared ``backend`` the backend is the source of truth and the
+    in-process entries are a cache in front of it: a read checks the stored
+    version and only reloads the session if another worker changed it, and
+    a save fails with SessionConflictError if the session moved on since it
+    was read. Async handlers use get_async, create_async and save_async, which
+    make those blocking backend calls on a worker thread.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl: Optional[float] = SESSION_TTL_SEC,
+                 max_bytes: int = MAX_BYTES, backend: Optional[SessionBackend] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._lock = threading.Lock()
+        # session_id -> (record, size, last access)
+        self._entries: "OrderedDict[str, Tuple[SessionRecord, int, float]]" = OrderedDict()
+        self._strings = _InternPool()
+        self._record_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.conflicts = 0
+        self.evictions = {"ttl": 0, "capacity": 0, "memory": 0}
+
+    def _min_updated_at(self) -> float:
+        return time.time() - self.ttl if self.ttl is not None else 0.0
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        if self.backend is not None:
+            with span("session_read"):
+                return self._get_shared(session_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and self._expired(entry, now):
+                self._remove(session_id)
+                self.evictions["ttl"] += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            record, size, _ = entry
+            self._entries[session_id] = (record, size, now)
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return record
+
+    def _get_shared(self, session_id: str) -> Optional[SessionRecord]:
+        version = self.backend.version(session_id, self._min_updated_at())
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if version is None:
+                if entry is not None:
+                    self._remove(session_id)
+                self.misses += 1
+                return None
+            if entry is not None and entry[0].version == version:
+                record, size, _ = entry
+                self._entries[session_id] = (record, size, time.monotonic())
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return record
+
+        loaded = self.backend.load(session_id, self._min_updated_at())
+        if loaded is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        record = SessionRecord.from_dict(*loaded)
+        with self._lock:
+            self.reloads += 1
+            self._cache(record)
+        return record
+
+    def create(self, record: SessionRecord) -> None:
+        """Add a new session, interning its shared strings."""
+        if self.backend is not None:
+            with span("session_write"):
+                if self.ttl is not None:
+                    self.backend.purge(time.time() - self.ttl)
+                record.version = self.backend.insert(record.session_id, record.user_id, record.to_dict())
+        with self._lock:
+            self._cache(record)
+
+    def save(self, record: SessionRecord) -> None:
+        """Persist a session after it was modified and re-measure it."""
+        if self.backend is not None:
+            try:
+                with span("session_write"):
+                    record.version = self.backend.update(record.session_id, record.to_dict(), record.version)
+            except SessionConflictError:
+                # This copy is stale; the next read reloads it from the backend
+                with self._lock:
+                    self.conflicts += 1
+                    if self._entries.get(record.session_id, (None,))[0] is record:
+                        self._remove(record.session_id)
+                raise
+        with self._lock:
+            self._cache(record)
+
+    async def get_async(self, session_id: str) -> Optional[SessionRecord]:
+        if self.backend is None:
+            return self.get(session_id)
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def create_async(self, record: SessionRecord) -> None:
+        if self.backend is None:
+            return self.create(record)
+        await asyncio.to_thread(self.create, record)
+
+    async def save_async(self, record: SessionRecord) -> None:
+        if self.backend is None:
+            return self.save(record)
+        await asyncio.to_thread(self.save, record)
+
+    def delete(self, session_id: str) -> None:
+        if self.backend is not None:
+            self.backend.delete(session_id)
+        with self._lock:
+            if session_id in self._entries:
+                self._remove(session_id)
+
+    def _cache(self, record: SessionRecord) -> None:
+        entry = self._entries.get(record.session_id)
+        if entry is not None and entry[0] is record:
+            self._record_bytes -= entry[1]
+        else:
+            if entry is not None:
+                # A reloaded copy replaces the stale one
+                self._remove(record.session_id)
+            record.role = self._strings.acquire(sys.intern(record.role))
+            record.job_description = self._strings.acquire(record.job_description)
+        self._put(record)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _put(self, record: SessionRecord) -> None:
+        size = record.nbytes()
+        now = time.monotonic()
+        self._entries[record.session_id] = (record, size, now)
+        self._entries.move_to_end(record.session_id)
+        self._record_bytes += size
+        self._evict(now, keep=record.session_id)
+
+    def _expired(self, entry: Tuple[SessionRecord, int, float], now: float) -> bool:
+        return self.ttl is not None and now - entry[2] > self.ttl
+
+    def _evict(self, now: float, keep: str) -> None:
+        # Least recently used first, so expired sessions sit at the front
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if session_id == keep:
+                break
+            if self._expired(entry, now):
+                reason = "ttl"
+            elif len(self._entries) > self.max_sessions:
+                reason = "capacity"
+            elif self._record_bytes + self._strings.nbytes > self.max_bytes:
+                reason = "memory"
+            else:
+                break
+            self._remove(session_id)
+            self.evictions[reason] += 1
+
+    def _remove(self, session_id: str) -> None:
+        record, size, _ = self._entries.pop(session_id)
+        self._record_bytes -= size
+        self._strings.release(record.role)
+        self._strings.release(record.job_description)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "resident_sessions": len(self._entries),
+                "resident_bytes": self._record_bytes + self._strings.nbytes,
+                "shared_strings": len(self._strings),
+                "shared_string_bytes": self._strings.nbytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "reloads": self.reloads,
+                "conflicts": self.conflicts,
+                "evictions": dict(self.evictions),
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+            }
+
+def create_session_store() -> SessionStore:
+    """The store configured by the environment: in-process only, or in front of SESSION_BACKEND_URL."""
+    return SessionStore(backend=backend_from_url(SESSION_BACKEND_URL))
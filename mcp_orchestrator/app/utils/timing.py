@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Set REQUEST_TIMING=0 to turn spans, the Server-Timing header and the timing log line off
+TIMING_ENABLED = os.getenv("REQUEST_TIMING", "1") != "0"
+
+class _NoopSpan:
+    """Returned by span() outside a timed request; costs one context variable lookup."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+_NOOP_SPAN = _NoopSpan()
+
+class Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "RequestTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+class RequestTimer:
+    """
+    Where one request's time went, summed per stage name.
+
+    Stages that run concurrently (e.g. scoring alongside the next question)
+    are timed separately, so their sum can exceed the total.
+    """
+
+    __slots__ = ("endpoint", "start", "totals", "counts")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        """The spans as a ``Server-Timing`` header value, durations in milliseconds."""
+        metrics = []
+        for name, seconds in self.totals.items():
+            metric = f"{name};dur={seconds * 1000:.1f}"
+            if self.counts[name] > 1:
+                metric += f';desc="{self.counts[name]} calls"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(metrics)
+
+    def log_record(self, **fields: Any) -> Dict[str, Any]:
+        return {
+            'severity': 'INFO',
+            'message': 'request timing',
+            'endpoint': self.endpoint,
+            **fields,
+            'total_ms': round(self.elapsed_ms(), 1),
+            'spans_ms': {name: round(seconds * 1000, 1) for name, seconds in self.totals.items()},
+            'span_counts': dict(self.counts),
+        }
+
+    def log(self, **fields: Any) -> None:
+        """Emit the timings as one structured log line."""
+        print(json.dumps(self.log_record(**fields)))
+
+# Timer of the request the current task or thread is serving
+request_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+def start_request(endpoint: str) -> Optional[RequestTimer]:
+    """Start timing a request in the current context; None when timing is disabled."""
+    if not TIMING_ENABLED:
+        return None
+    timer = RequestTimer(endpoint)
+    request_timer.set(timer)
+    return timer
+
+def span(name: str):
+    """
+    Time a stage of the current request::
+
+        with span("firestore_read"):
+            ...
+
+    Tasks started by the request inherit its timer; outside a timed request
+    this is a no-op.
+    """
+    timer = request_timer.get()
+    if timer is None:
+        return _NOOP_SPAN
+    return Span(timer, name)
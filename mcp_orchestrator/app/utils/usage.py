@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# USD per million prompt and completion tokens; LLM_PRICES overrides or adds
+# models as JSON, e.g. {"gpt-4o-mini": [0.15, 0.6]}
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("LLM_PRICES", "{}")).items()})
+
+# Per-prompt totals kept for sessions and users
+USAGE_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "latency_ms", "cost_usd")
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call; 0 for models without a known price."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+class CallUsage(NamedTuple):
+    """What one LLM call consumed."""
+    prompt: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    latency_sec: float
+
+    @property
+    def cost_usd(self) -> float:
+        return call_cost(self.model, self.prompt_tokens, self.completion_tokens)
+
+def summarize(calls: List[CallUsage]) -> Dict[str, Dict[str, float]]:
+    """Per-prompt totals of ``calls``, with the fields in USAGE_FIELDS."""
+    totals: Dict[str, Dict[str, float]] = {}
+    for call in calls:
+        add_call(totals.setdefault(call.prompt, dict.fromkeys(USAGE_FIELDS, 0)), call)
+    return totals
+
+def add_call(entry: Dict[str, float], call: CallUsage) -> None:
+    entry["calls"] += 1
+    entry["prompt_tokens"] += call.prompt_tokens
+    entry["completion_tokens"] += call.completion_tokens
+    entry["total_tokens"] += call.total_tokens
+    entry["latency_ms"] += call.latency_sec * 1000
+    entry["cost_usd"] += call.cost_usd
+
+def merge_totals(into: Dict[str, Dict[str, float]], totals: Dict[str, Dict[str, float]]) -> None:
+    """Add per-prompt ``totals`` to ``into`` in place."""
+    for prompt, fields in totals.items():
+        entry = into.setdefault(prompt, dict.fromkeys(USAGE_FIELDS, 0))
+        for field in USAGE_FIELDS:
+            entry[field] += fields.get(field, 0)
+
+# Prometheus counter name, help text, usage field and scale
+PROMETHEUS_COUNTERS = (
+    ("llm_calls_total", "LLM calls made", "calls", 1),
+    ("llm_prompt_tokens_total", "Prompt tokens sent", "prompt_tokens", 1),
+    ("llm_completion_tokens_total", "Completion tokens received", "completion_tokens", 1),
+    ("llm_tokens_total", "Prompt plus completion tokens", "total_tokens", 1),
+    ("llm_latency_seconds_total", "Time spent in LLM calls", "latency_ms", 0.001),
+    ("llm_cost_usd_total", "Estimated LLM cost in USD", "cost_usd", 1),
+)
+
+def prometheus_text(series: List[Tuple[Dict[str, str], Dict[str, float]]]) -> str:
+    """Render usage totals, one (labels, totals) pair per series, in the Prometheus text format."""
+    lines = []
+    for name, help_text, field, scale in PROMETHEUS_COUNTERS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, totals in series:
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+            lines.append(f"{name}{{{label_text}}} {totals.get(field, 0) * scale:g}")
+    return "\n".join(lines) + "\n"
+
+class UsageMeter:
+    """
+    Process-wide LLM usage totals by prompt and model.
+
+    Totals only grow, so they can be scraped as Prometheus counters and rated
+    over time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def record(self, call: CallUsage) -> None:
+        with self._lock:
+            add_call(self._totals.setdefault((call.prompt, call.model), dict.fromkeys(USAGE_FIELDS, 0)), call)
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        with self._lock:
+            return {key: dict(totals) for key, totals in self._totals.items()}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Totals per prompt, across models."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for (prompt, _), entry in self.snapshot().items():
+            merge_totals(totals, {prompt: entry})
+        return totals
+
+    def prometheus(self) -> str:
+        return prometheus_text([
+            ({"prompt": prompt, "model": model}, totals)
+            for (prompt, model), totals in sorted(self.snapshot().items())
+        ])
+
+# Calls made while serving the current request, if it is tracking them
+call_usage: ContextVar[Optional[List[CallUsage]]] = ContextVar("call_usage", default=None)
+
+def track_calls() -> List[CallUsage]:
+    """Collect the LLM calls made from the current context, including tasks it starts."""
+    calls: List[CallUsage] = []
+    call_usage.set(calls)
+    return calls
+
+def record_call(call: CallUsage) -> None:
+    usage_meter.record(call)
+    calls = call_usage.get()
+    if calls is not None:
+        calls.append(call)
+
+# Shared by every LLM call in the process
+usage_meter = UsageMeter()
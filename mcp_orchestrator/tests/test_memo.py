@@ -0,0 +1,51 @@
+import asyncio
+
+from mcp_orchestrator.app.agents.base import FeedbackAgent, FeedbackRequest
+from mcp_orchestrator.app.utils.memo import AgentMemo
+
+def test_waiter_takes_over_when_the_computing_caller_is_cancelled():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def run():
+        memo = AgentMemo()
+        first = asyncio.ensure_future(memo.get_or_compute("key", compute))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(memo.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.wait_for(second, 5), first.cancelled()
+
+    value, first_cancelled = asyncio.run(run())
+    assert first_cancelled
+    assert value == 2
+    assert len(calls) == 2
+
+class _StreamingClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_feedback(self, **_):
+        self.calls += 1
+        for token in ("Good ", "answer."):
+            await asyncio.sleep(0.01)
+            yield token
+
+def test_concurrent_streamed_feedback_makes_one_call():
+    async def collect(agent, request):
+        return "".join([token async for token in agent.stream_feedback(request)])
+
+    async def run():
+        agent = FeedbackAgent(memo=AgentMemo())
+        agent.openai_client = _StreamingClient()
+        request = FeedbackRequest(question="q", response="r", score=0.8, role="engineer", job_description="j")
+        results = await asyncio.gather(collect(agent, request), collect(agent, request))
+        return results, agent.openai_client.calls
+
+    results, calls = asyncio.run(run())
+    assert calls == 1
+    assert results[0].strip() == results[1] == "Good answer."
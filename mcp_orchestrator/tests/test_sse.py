@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from mcp_orchestrator.app.utils.sse import EventStreamCancelled, merge_event_streams
+
+async def _events(name, count, delay=0.0):
+    for i in range(count):
+        await asyncio.sleep(delay)
+        yield name, i
+
+async def _cancelled_after(count):
+    async for item in _events("cancelled", count):
+        yield item
+    raise asyncio.CancelledError()
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+def test_merges_every_event():
+    items = asyncio.run(_collect(merge_event_streams(_events("a", 3), _events("b", 2))))
+    assert sorted(items) == [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1)]
+
+def test_cancelled_producer_ends_the_stream():
+    # A producer cancelled mid-stream used to leave the consumer waiting forever
+    async def consume():
+        await asyncio.wait_for(_collect(merge_event_streams(_cancelled_after(1), _events("b", 50, 0.01))), 5)
+
+    with pytest.raises(EventStreamCancelled):
+        asyncio.run(consume())
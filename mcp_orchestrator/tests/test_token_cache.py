@@ -0,0 +1,32 @@
+import pytest
+
+firebase_admin = pytest.importorskip("firebase_admin")
+
+from cachecontrol import CacheControlAdapter
+from google.auth.credentials import AnonymousCredentials
+from firebase_admin import _token_gen, auth, credentials
+
+from mcp_orchestrator.app.utils.token_cache import prefetch_firebase_certs
+
+class _Credential(credentials.Base):
+    def get_credential(self):
+        return AnonymousCredentials()
+
+@pytest.fixture
+def app():
+    app = firebase_admin.initialize_app(_Credential(), {"projectId": "test-project"}, name="token-cache-test")
+    yield app
+    firebase_admin.delete_app(app)
+
+def test_prefetch_warms_the_key_fetcher_verification_uses(app, monkeypatch):
+    # prefetch_firebase_certs reaches into firebase_admin internals; this
+    # fails if an upgrade of the pinned version moves them
+    verifier = auth._get_client(app)._token_verifier
+    assert verifier.id_token_verifier.cert_url == _token_gen.ID_TOKEN_CERT_URI
+    adapter = verifier.request.session.get_adapter(_token_gen.ID_TOKEN_CERT_URI)
+    assert isinstance(adapter, CacheControlAdapter)
+
+    urls = []
+    monkeypatch.setattr(verifier, "request", lambda url, **_: urls.append(url))
+    prefetch_firebase_certs(app)
+    assert urls == [_token_gen.ID_TOKEN_CERT_URI]